@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from llm_cache import LLMCache
+from skills import extract_skills_from_text
+from tracing import tracer
+
+DEFAULT_ANALYSIS_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analysis_cache.sqlite3")
+
+# Same last resort the app used when no skills could be extracted
+FALLBACK_QUERY = ["general", "software", "development"]
+
+
+def posting_hash(job_text: str) -> str:
+    """Hash of the posting content, ignoring differences in whitespace"""
+    return hashlib.sha256(" ".join(job_text.split()).encode("utf-8")).hexdigest()
+
+
+def requirements_query(requirements: Optional[Dict[str, Any]]) -> List[str]:
+    """Retrieval terms from parsed requirements: key requirements, then soft skills, then industry"""
+    if not requirements:
+        return []
+    terms = list(requirements.get("key_requirements") or []) + list(requirements.get("soft_skills") or [])
+    if requirements.get("industry"):
+        terms.append(requirements["industry"])
+    return list(dict.fromkeys(term for term in terms if term))
+
+
+class PostingAnalyzer:
+    def __init__(self, chain, portfolio, cache=None, n_results=3):
+        """Requirements extraction plus portfolio retrieval for a posting, cached per posting content
+
+        The cache key covers the posting hash, the portfolio version and n_results, so
+        a changed portfolio never serves stale links.
+        """
+        self.chain = chain
+        self.portfolio = portfolio
+        self.cache = cache if cache is not None else LLMCache(path=DEFAULT_ANALYSIS_CACHE_PATH, max_entries=2000)
+        self.n_results = n_results
+
+    def _key(self, content_hash: str) -> str:
+        version = getattr(self.portfolio, "version", "")
+        backend = "fallback" if getattr(self.portfolio, "use_fallback", False) else "vector"
+        return f"{content_hash}:{version}:{backend}:{self.n_results}"
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        try:
+            return dict(json.loads(cached), from_cache=True)
+        except ValueError as e:
+            logging.error(f"Ignoring unreadable cached analysis: {e}")
+            return None
+
+    def _build(self, content_hash, requirements, skills, relevant_links, query) -> Dict[str, Any]:
+        return {
+            "posting_hash": content_hash,
+            "requirements": requirements,
+            "skills": skills,
+            "query": query,
+            "relevant_links": relevant_links,
+            "from_cache": False
+        }
+
+    def _store(self, key: str, analysis: Dict[str, Any]):
+        # A failed extraction is not cached so the next request gets another try
+        if analysis["requirements"] is not None:
+            self.cache.set(key, json.dumps(analysis))
+
+    def _query(self, requirements, job_text):
+        """Skills for display plus the retrieval query (requirements first, extracted skills as fallback)"""
+        with tracer.span("skills"):
+            skills = extract_skills_from_text(job_text)
+        return skills, requirements_query(requirements) or skills or list(FALLBACK_QUERY)
+
+    def analyze(self, job_text: str) -> Dict[str, Any]:
+        """Requirements, skills and relevant portfolio links for a posting"""
+        content_hash = posting_hash(job_text)
+        key = self._key(content_hash)
+        with tracer.span("analysis") as span:
+            analysis = self._cached(key)
+            span.set("cache_hit", analysis is not None)
+            if analysis is not None:
+                return analysis
+
+            requirements = self.chain.extract_job_requirements(job_text)
+            skills, query = self._query(requirements, job_text)
+            with tracer.span("portfolio"):
+                relevant_links = self.portfolio.query_links(query, self.n_results)
+
+            analysis = self._build(content_hash, requirements, skills, relevant_links, query)
+            self._store(key, analysis)
+            return analysis
+
+    async def aanalyze(self, job_text: str) -> Dict[str, Any]:
+        """Async version of analyze; the portfolio query runs in a worker thread"""
+        content_hash = posting_hash(job_text)
+        key = self._key(content_hash)
+        with tracer.span("analysis") as span:
+            analysis = self._cached(key)
+            span.set("cache_hit", analysis is not None)
+            if analysis is not None:
+                return analysis
+
+            requirements = await self.chain.aextract_job_requirements(job_text)
+            skills, query = self._query(requirements, job_text)
+            with tracer.span("portfolio"):
+                relevant_links = await asyncio.to_thread(self.portfolio.query_links, query, self.n_results)
+
+            analysis = self._build(content_hash, requirements, skills, relevant_links, query)
+            self._store(key, analysis)
+            return analysis
@@ -1,50 +1,166 @@
+import uuid
+import os
 import streamlit as st
-from langchain_community.document_loaders import WebBaseLoader
 from chains import Chain
 from portfolio import Portfolio
-import re
-from urllib.parse import urlparse
+from fetcher import get_fetcher, is_valid_url
+from condense import condense_job_text
+from analysis import PostingAnalyzer, DEFAULT_ANALYSIS_CACHE_PATH
+from llm_cache import LLMCache
+from tracing import tracer
+from service import GenerationClient
 
 
-def is_valid_url(url):
-    """Validate if the URL is properly formatted"""
-    try:
-        result = urlparse(url)
-        return all([result.scheme, result.netloc])
-    except Exception:
-        return False
+@st.cache_resource(show_spinner=False)
+def get_chain():
+    """Process-wide Chain shared by every session and rerun"""
+    return Chain()
+
+
+@st.cache_resource(show_spinner="📂 Loading portfolio...")
+def get_portfolio():
+    """Process-wide Portfolio, synced into the vector store once per process"""
+    portfolio = Portfolio()
+    portfolio.load_portfolio()
+    return portfolio
+
+
+@st.cache_resource(show_spinner=False)
+def get_analysis_cache():
+    """Process-wide cache of per-posting requirements and portfolio matches"""
+    return LLMCache(path=DEFAULT_ANALYSIS_CACHE_PATH, max_entries=2000)
+
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_server(port):
+    """Expose tracer metrics on /metrics once per process"""
+    return tracer.serve_metrics(port)
 
 
-def extract_skills_from_text(text):
-    """Extract relevant skills/keywords from job posting text"""
-    # Common tech skills and job-related keywords
-    tech_keywords = [
-        'python', 'javascript', 'java', 'react', 'nodejs', 'sql', 'aws', 'docker',
-        'kubernetes', 'machine learning', 'data science', 'frontend', 'backend',
-        'fullstack', 'devops', 'api', 'database', 'html', 'css', 'git', 'agile',
-        'scrum', 'tensorflow', 'pytorch', 'django', 'flask', 'spring', 'mongodb',
-        'postgresql', 'redis', 'elasticsearch', 'microservices', 'cloud', 'azure',
-        'gcp', 'ci/cd', 'testing', 'automation', 'analytics', 'visualization'
-    ]
+def render_results(result):
+    """Render a generated email and its analysis from session state"""
+    st.success("🎉 Cold email generated successfully!")
+    
+    # Show analysis results
+    with st.expander("📊 Analysis Results", expanded=False):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            requirements = result.get("requirements")
+            if requirements:
+                st.subheader("📋 Key Requirements")
+                if requirements["job_title"] or requirements["company_name"]:
+                    st.caption(" at ".join(filter(None, [requirements["job_title"], requirements["company_name"]])))
+                for requirement in requirements["key_requirements"]:
+                    st.write(f"• {requirement}")
+            
+            st.subheader("🎯 Extracted Skills/Keywords")
+            if result["skills"]:
+                for skill in result["skills"]:
+                    st.badge(skill)
+            else:
+                st.info("No specific skills extracted")
+        
+        with col2:
+            st.subheader("🔗 Matching Portfolio Projects")
+            if result["relevant_links"]:
+                st.success(f"Found {len(result['relevant_links'])} matching projects")
+                for link in result["relevant_links"]:
+                    st.write(f"• {link}")
+            else:
+                st.warning("No matching portfolio projects found")
+        
+        # Show job posting preview (results from the generation service don't carry the text)
+        if result.get("job_text"):
+            st.subheader("📄 Job Posting Preview")
+            st.caption(f"Condensed from {result['tokens_before']} to {result['tokens_after']} tokens")
+            job_text = result["job_text"]
+            preview_text = job_text[:500] + "..." if len(job_text) > 500 else job_text
+            st.text_area("Job Content:", preview_text, height=100, disabled=True)
+        
+        # Per-step timings and token usage from the pipeline trace
+        if result.get("trace"):
+            st.subheader("⏱️ Pipeline Steps")
+            st.dataframe([
+                {
+                    "step": span["name"],
+                    "duration (ms)": span["duration_ms"],
+                    "prompt tokens": span["attributes"].get("prompt_tokens"),
+                    "completion tokens": span["attributes"].get("completion_tokens"),
+                    "cache hit": span["attributes"].get("cache_hit"),
+                    "error": span["error"]
+                }
+                for span in result["trace"]
+            ], width="stretch")
+    
+    # Display the generated email
+    st.subheader("📨 Generated Cold Email")
+    st.code(result["email"], language="text")
     
-    text_lower = text.lower()
-    found_skills = []
+    # Add copy button functionality
+    if st.button("📋 Copy Email to Clipboard"):
+        st.success("Email copied to clipboard! (Use Ctrl+C to copy the text above)")
     
-    # Extract skills that appear in the text
-    for skill in tech_keywords:
-        if skill in text_lower:
-            found_skills.append(skill)
+    # Additional tips
+    with st.expander("💡 Tips for Using This Email", expanded=False):
+        st.markdown("""
+        **Before sending:**
+        - Review and personalize the email further
+        - Add specific details about the company
+        - Double-check all links work correctly
+        - Ensure the tone matches your style
+        - Add your contact information
+        - Proofread for any errors
+        """)
+
+
+def generate_via_service(service_url, url):
+    """Submit the URL to the generation service and poll until the email is ready"""
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    progress = {"queued": (10, "⏳ Waiting for a worker..."), "running": (50, "✍️ Generating cold email...")}
     
-    # Also extract some key words from the text (remove common words)
-    words = re.findall(r'\b[a-zA-Z]{3,}\b', text_lower)
-    common_words = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one', 'our', 'had', 'but', 'what', 'were', 'they', 'have', 'this', 'from', 'that', 'will', 'with', 'been', 'said', 'each', 'which', 'their', 'time', 'about', 'would', 'there', 'could', 'other', 'after', 'first', 'well', 'water', 'than', 'many', 'them', 'these', 'come', 'made', 'then', 'more', 'very', 'when', 'much', 'before', 'here', 'through', 'just', 'good', 'should', 'because', 'each', 'those', 'people', 'most', 'some', 'time', 'very', 'when', 'much', 'new', 'write', 'would', 'like', 'where', 'right', 'see', 'him', 'two', 'how', 'its', 'who', 'oil', 'sit', 'now', 'find', 'long', 'down', 'day', 'did', 'get', 'has', 'may', 'his', 'old', 'take', 'cat', 'again', 'give', 'after', 'came', 'show', 'every', 'good', 'me', 'give', 'our', 'under', 'name', 'very', 'through', 'just', 'form', 'sentence', 'great', 'think', 'say', 'help', 'low', 'line', 'differ', 'turn', 'cause', 'much', 'mean', 'before', 'move', 'right', 'boy', 'old', 'too', 'same', 'tell', 'does', 'set', 'three', 'want', 'air', 'well', 'also', 'play', 'small', 'end', 'put', 'home', 'read', 'hand', 'port', 'large', 'spell', 'add', 'even', 'land', 'here', 'must', 'big', 'high', 'such', 'follow', 'act', 'why', 'ask', 'men', 'change', 'went', 'light', 'kind', 'off', 'need', 'house', 'picture', 'try', 'again', 'animal', 'point', 'mother', 'world', 'near', 'build', 'self', 'earth', 'father', 'head', 'stand', 'own', 'page', 'should', 'country', 'found', 'answer', 'school', 'grow', 'study', 'still', 'learn', 'plant', 'cover', 'food', 'sun', 'four', 'between', 'state', 'keep', 'eye', 'never', 'last', 'let', 'thought', 'city', 'tree', 'cross', 'farm', 'hard', 'start', 'might', 'story', 'saw', 'far', 'sea', 'draw', 'left', 'late', 'run', 'don', 'while', 'press', 'close', 'night', 'real', 'life', 'few', 'north', 'open', 'seem', 'together', 'next', 'white', 'children', 'begin', 'got', 'walk', 'example', 'ease', 'paper', 'group', 'always', 'music', 'those', 'both', 'mark', 'often', 'letter', 'until', 'mile', 'river', 'car', 'feet', 'care', 'second', 'book', 'carry', 'took', 'science', 'eat', 'room', 'friend', 'began', 'idea', 'fish', 'mountain', 'stop', 'once', 'base', 'hear', 'horse', 'cut', 'sure', 'watch', 'color', 'face', 'wood', 'main', 'enough', 'plain', 'girl', 'usual', 'young', 'ready', 'above', 'ever', 'red', 'list', 'though', 'feel', 'talk', 'bird', 'soon', 'body', 'dog', 'family', 'direct', 'leave', 'song', 'measure', 'door', 'product', 'black', 'short', 'numeral', 'class', 'wind', 'question', 'happen', 'complete', 'ship', 'area', 'half', 'rock', 'order', 'fire', 'south', 'problem', 'piece', 'told', 'knew', 'pass', 'since', 'top', 'whole', 'king', 'space', 'heard', 'best', 'hour', 'better', 'during', 'hundred', 'five', 'remember', 'step', 'early', 'hold', 'west', 'ground', 'interest', 'reach', 'fast', 'verb', 'sing', 'listen', 'six', 'table', 'travel', 'less', 'morning', 'ten', 'simple', 'several', 'vowel', 'toward', 'war', 'lay', 'against', 'pattern', 'slow', 'center', 'love', 'person', 'money', 'serve', 'appear', 'road', 'map', 'rain', 'rule', 'govern', 'pull', 'cold', 'notice', 'voice', 'unit', 'power', 'town', 'fine', 'certain', 'fly', 'fall', 'lead', 'cry', 'dark', 'machine', 'note', 'wait', 'plan', 'figure', 'star', 'box', 'noun', 'field', 'rest', 'correct', 'able', 'pound', 'done', 'beauty', 'drive', 'stood', 'contain', 'front', 'teach', 'week', 'final', 'gave', 'green', 'oh', 'quick', 'develop', 'ocean', 'warm', 'free', 'minute', 'strong', 'special', 'mind', 'behind', 'clear', 'tail', 'produce', 'fact', 'street', 'inch', 'multiply', 'nothing', 'course', 'stay', 'wheel', 'full', 'force', 'blue', 'object', 'decide', 'surface', 'deep', 'moon', 'island', 'foot', 'system', 'busy', 'test', 'record', 'boat', 'common', 'gold', 'possible', 'plane', 'stead', 'dry', 'wonder', 'laugh', 'thousands', 'ago', 'ran', 'check', 'game', 'shape', 'equate', 'hot', 'miss', 'brought', 'heat', 'snow', 'tire', 'bring', 'yes', 'distant', 'fill', 'east', 'paint', 'language', 'among', 'grand', 'ball', 'yet', 'wave', 'drop', 'heart', 'present', 'heavy', 'dance', 'engine', 'position', 'arm', 'wide', 'sail', 'material', 'size', 'vary', 'settle', 'speak', 'weight', 'general', 'ice', 'matter', 'circle', 'pair', 'include', 'divide', 'syllable', 'felt', 'perhaps', 'pick', 'sudden', 'count', 'square', 'reason', 'length', 'represent', 'art', 'subject', 'region', 'energy', 'hunt', 'probable', 'bed', 'brother', 'egg', 'ride', 'cell', 'believe', 'fraction', 'forest', 'sit', 'race', 'window', 'store', 'summer', 'train', 'sleep', 'prove', 'lone', 'leg', 'exercise', 'wall', 'catch', 'mount', 'wish', 'sky', 'board', 'joy', 'winter', 'sat', 'written', 'wild', 'instrument', 'kept', 'glass', 'grass', 'cow', 'job', 'edge', 'sign', 'visit', 'past', 'soft', 'fun', 'bright', 'gas', 'weather', 'month', 'million', 'bear', 'finish', 'happy', 'hope', 'flower', 'clothe', 'strange', 'gone', 'jump', 'baby', 'eight', 'village', 'meet', 'root', 'buy', 'raise', 'solve', 'metal', 'whether', 'push', 'seven', 'paragraph', 'third', 'shall', 'held', 'hair', 'describe', 'cook', 'floor', 'either', 'result', 'burn', 'hill', 'safe', 'cat', 'century', 'consider', 'type', 'law', 'bit', 'coast', 'copy', 'phrase', 'silent', 'tall', 'sand', 'soil', 'roll', 'temperature', 'finger', 'industry', 'value', 'fight', 'lie', 'beat', 'excite', 'natural', 'view', 'sense', 'ear', 'else', 'quite', 'broke', 'case', 'middle', 'kill', 'son', 'lake', 'moment', 'scale', 'loud', 'spring', 'observe', 'child', 'straight', 'consonant', 'nation', 'dictionary', 'milk', 'speed', 'method', 'organ', 'pay', 'age', 'section', 'dress', 'cloud', 'surprise', 'quiet', 'stone', 'tiny', 'climb', 'bad', 'oil', 'blood', 'touch', 'grew', 'cent', 'mix', 'team', 'wire', 'cost', 'lost', 'brown', 'wear', 'garden', 'equal', 'sent', 'choose', 'fell', 'fit', 'flow', 'fair', 'bank', 'collect', 'save', 'control', 'decimal', 'gentle', 'woman', 'captain', 'practice', 'separate', 'difficult', 'doctor', 'please', 'protect', 'noon', 'whose', 'locate', 'ring', 'character', 'insect', 'caught', 'period', 'indicate', 'radio', 'spoke', 'atom', 'human', 'history', 'effect', 'electric', 'expect', 'crop', 'modern', 'element', 'hit', 'student', 'corner', 'party', 'supply', 'bone', 'rail', 'imagine', 'provide', 'agree', 'thus', 'capital', 'won', 'chair', 'danger', 'fruit', 'rich', 'thick', 'soldier', 'process', 'operate', 'guess', 'necessary', 'sharp', 'wing', 'create', 'neighbor', 'wash', 'bat', 'rather', 'crowd', 'corn', 'compare', 'poem', 'string', 'bell', 'depend', 'meat', 'rub', 'tube', 'famous', 'dollar', 'stream', 'fear', 'sight', 'thin', 'triangle', 'planet', 'hurry', 'chief', 'colony', 'clock', 'mine', 'tie', 'enter', 'major', 'fresh', 'search', 'send', 'yellow', 'gun', 'allow', 'print', 'dead', 'spot', 'desert', 'suit', 'current', 'lift', 'rose', 'continue', 'block', 'chart', 'hat', 'sell', 'success', 'company', 'subtract', 'event', 'particular', 'deal', 'swim', 'term', 'opposite', 'wife', 'shoe', 'shoulder', 'spread', 'arrange', 'camp', 'invent', 'cotton', 'born', 'determine', 'quart', 'nine', 'truck', 'noise', 'level', 'chance', 'gather', 'shop', 'stretch', 'throw', 'shine', 'property', 'column', 'molecule', 'select', 'wrong', 'gray', 'repeat', 'require', 'broad', 'prepare', 'salt', 'nose', 'plural', 'anger', 'claim', 'continent', 'oxygen', 'sugar', 'death', 'pretty', 'skill', 'women', 'season', 'solution', 'magnet', 'silver', 'thank', 'branch', 'match', 'suffix', 'especially', 'fig', 'afraid', 'huge', 'sister', 'steel', 'discuss', 'forward', 'similar', 'guide', 'experience', 'score', 'apple', 'bought', 'led', 'pitch', 'coat', 'mass', 'card', 'band', 'rope', 'slip', 'win', 'dream', 'evening', 'condition', 'feed', 'tool', 'total', 'basic', 'smell', 'valley', 'nor', 'double', 'seat', 'arrive', 'master', 'track', 'parent', 'shore', 'division', 'sheet', 'substance', 'favor', 'connect', 'post', 'spend', 'chord', 'fat', 'glad', 'original', 'share', 'station', 'dad', 'bread', 'charge', 'proper', 'bar', 'offer', 'segment', 'slave', 'duck', 'instant', 'market', 'degree', 'populate', 'chick', 'dear', 'enemy', 'reply', 'drink', 'occur', 'support', 'speech', 'nature', 'range', 'steam', 'motion', 'path', 'liquid', 'log', 'meant', 'quotient', 'teeth', 'shell', 'neck'}
+    def on_status(status):
+        value, text = progress.get(status["status"], (100, "✅ Done"))
+        progress_bar.progress(value)
+        status_text.text(text)
     
-    # Get unique non-common words
-    extracted_words = list(set([word for word in words if word not in common_words]))[:15]
+    try:
+        client = GenerationClient(service_url)
+        # A fresh key per generation; a click that interrupts the wait for this URL reuses it
+        # instead of queueing the posting twice
+        pending = st.session_state.get("pending_job")
+        if pending is None or pending["url"] != url:
+            pending = {"url": url, "key": uuid.uuid4().hex}
+            st.session_state["pending_job"] = pending
+        job = client.submit(url, key=pending["key"])
+        record = client.wait(job["id"], on_status=on_status)
+        st.session_state.pop("pending_job", None)
+        progress_bar.empty()
+        status_text.empty()
+        
+        if record["status"] != "ok":
+            st.error(f"❌ Error generating email: {record['error']}")
+            return False
+        
+        st.session_state["result"] = {
+            "url": url,
+            "email": record["email"],
+            "skills": record["skills"],
+            "requirements": record.get("requirements"),
+            "relevant_links": record["links"],
+            "tokens_before": record.get("tokens_before"),
+            "tokens_after": record.get("tokens_after"),
+            "trace": record.get("trace")
+        }
+        return True
     
-    # Combine and limit to reasonable number
-    all_skills = found_skills + extracted_words
-    return list(set(all_skills))[:20]  # Return unique skills, max 20
+    except Exception as e:
+        st.session_state.pop("pending_job", None)
+        progress_bar.empty()
+        status_text.empty()
+        st.error(f"❌ Generation service unavailable: {str(e)}")
+        return False
 
 
 def create_app(chain, portfolio):
@@ -59,14 +175,13 @@ def create_app(chain, portfolio):
         st.markdown("2. Click 'Generate Cold Email'")
         st.markdown("3. Review and copy the generated email")
         
-        # Add some portfolio info
+        # Add some portfolio info (the portfolio is loaded once per process in get_portfolio)
         st.markdown("---")
         st.markdown("**Portfolio Status:**")
-        try:
-            portfolio.load_portfolio()
+        if getattr(portfolio, 'use_fallback', False):
+            st.warning("⚠️ Vector store unavailable, using keyword matching")
+        else:
             st.success("✅ Portfolio loaded successfully")
-        except Exception as e:
-            st.error(f"❌ Portfolio loading failed: {str(e)}")
     
     # Main content area
     col1, col2 = st.columns([2, 1])
@@ -88,114 +203,90 @@ def create_app(chain, portfolio):
         st.error("⚠️ Please enter a valid URL (including https://)")
         return
     
-    if submit and url:
+    # Only the generate button runs the pipeline; any other rerun re-renders the stored result
+    service_url = os.getenv("GENERATION_SERVICE_URL")
+    if submit and url and service_url:
+        if not generate_via_service(service_url, url):
+            return
+    elif submit and url:
         if not is_valid_url(url):
             st.error("⚠️ Please enter a valid URL")
             return
-            
+        
         # Create progress bar
         progress_bar = st.progress(0)
         status_text = st.empty()
+        live_output = st.empty()
         
         try:
-            # Step 1: Fetch job posting
-            status_text.text("📥 Fetching job posting...")
-            progress_bar.progress(25)
-            
-            loader = WebBaseLoader([url])
-            documents = loader.load()
-            
-            if not documents:
-                st.error("❌ Could not fetch content from the URL. Please check if the URL is accessible.")
-                return
-            
-            raw_text = documents[0].page_content
-            
-            # Check if we got meaningful content
-            if len(raw_text.strip()) < 100:
-                st.warning("⚠️ The fetched content seems too short. This might not be a job posting.")
-            
-            progress_bar.progress(50)
-            
-            # Step 2: Load portfolio
-            status_text.text("📂 Loading portfolio...")
-            portfolio.load_portfolio()
-            progress_bar.progress(75)
-            
-            # Step 3: Extract skills and find relevant links
-            status_text.text("🔍 Analyzing job requirements...")
-            skills = extract_skills_from_text(raw_text)
-            
-            if not skills:
-                st.warning("⚠️ Could not extract relevant skills from the job posting.")
-                skills = ["general", "software", "development"]  # fallback
-            
-            progress_bar.progress(90)
-            
-            # Step 4: Query portfolio
-            relevant_links = portfolio.query_links(skills)
-            
-            # Step 5: Generate email
-            status_text.text("✍️ Generating cold email...")
-            email = chain.write_mail(raw_text, relevant_links)
-            progress_bar.progress(100)
-            
-            # Clear progress indicators
-            progress_bar.empty()
-            status_text.empty()
-            
-            # Display results
-            st.success("🎉 Cold email generated successfully!")
-            
-            # Show analysis results
-            with st.expander("📊 Analysis Results", expanded=False):
-                col1, col2 = st.columns(2)
+            with tracer.span("pipeline", url=url) as pipeline_span:
+                # Step 1: Fetch job posting
+                status_text.text("📥 Fetching job posting...")
+                progress_bar.progress(25)
                 
-                with col1:
-                    st.subheader("🎯 Extracted Skills/Keywords")
-                    if skills:
-                        for skill in skills:
-                            st.badge(skill)
-                    else:
-                        st.info("No specific skills extracted")
+                with tracer.span("fetch"):
+                    raw_text = get_fetcher().load_text(url)
                 
-                with col2:
-                    st.subheader("🔗 Matching Portfolio Projects")
-                    if relevant_links:
-                        st.success(f"Found {len(relevant_links)} matching projects")
-                        for link in relevant_links:
-                            st.write(f"• {link}")
-                    else:
-                        st.warning("No matching portfolio projects found")
+                if not raw_text:
+                    st.error("❌ Could not fetch content from the URL. Please check if the URL is accessible.")
+                    return
                 
-                # Show job posting preview
-                st.subheader("📄 Job Posting Preview")
-                preview_text = raw_text[:500] + "..." if len(raw_text) > 500 else raw_text
-                st.text_area("Job Content:", preview_text, height=100, disabled=True)
-            
-            # Display the generated email
-            st.subheader("📨 Generated Cold Email")
-            st.code(email, language="text")
-            
-            # Add copy button functionality
-            if st.button("📋 Copy Email to Clipboard"):
-                st.success("Email copied to clipboard! (Use Ctrl+C to copy the text above)")
-            
-            # Additional tips
-            with st.expander("💡 Tips for Using This Email", expanded=False):
-                st.markdown("""
-                **Before sending:**
-                - Review and personalize the email further
-                - Add specific details about the company
-                - Double-check all links work correctly
-                - Ensure the tone matches your style
-                - Add your contact information
-                - Proofread for any errors
-                """)
+                # Check if we got meaningful content
+                if len(raw_text.strip()) < 100:
+                    st.warning("⚠️ The fetched content seems too short. This might not be a job posting.")
+                
+                # Strip page boilerplate and fit the posting into the prompt token budget
+                with tracer.span("condense") as span:
+                    condensed = condense_job_text(raw_text)
+                    span.set("tokens_before", condensed["tokens_before"])
+                    span.set("tokens_after", condensed["tokens_after"])
+                job_text = condensed["text"]
+                
+                progress_bar.progress(50)
+                
+                # Step 2: Extract requirements and find relevant links (reused for a posting seen before)
+                status_text.text("🔍 Analyzing job requirements...")
+                analysis = PostingAnalyzer(chain, portfolio, cache=get_analysis_cache()).analyze(job_text)
+                skills = analysis["skills"]
+                relevant_links = analysis["relevant_links"]
+                
+                if not skills and not analysis["requirements"]:
+                    st.warning("⚠️ Could not extract relevant skills from the job posting.")
+                
+                progress_bar.progress(90)
+                
+                # Step 4: Generate email, rendering chunks as they arrive
+                status_text.text("✍️ Generating cold email...")
+                with tracer.span("email"), live_output.container():
+                    st.subheader("📨 Generated Cold Email")
+                    email_placeholder = st.empty()
+                    email = ""
+                    for chunk in chain.stream_mail(job_text, relevant_links):
+                        email += chunk
+                        email_placeholder.code(email + "▌", language="text")
+                progress_bar.progress(100)
                 
+            # Clear progress indicators
+            progress_bar.empty()
+            status_text.empty()
+            live_output.empty()
+            
+            st.session_state["result"] = {
+                "url": url,
+                "email": email,
+                "skills": skills,
+                "requirements": analysis["requirements"],
+                "relevant_links": relevant_links,
+                "job_text": job_text,
+                "tokens_before": condensed["tokens_before"],
+                "tokens_after": condensed["tokens_after"],
+                "trace": [span.to_dict() for span in tracer.trace(pipeline_span.trace_id)]
+            }
+        
         except Exception as e:
             progress_bar.empty()
             status_text.empty()
+            live_output.empty()
             st.error(f"❌ Error generating email: {str(e)}")
             
             # Show debug information in expander
@@ -210,19 +301,26 @@ def create_app(chain, portfolio):
                     st.write("✅ URL format is valid")
                 else:
                     st.write("❌ URL format is invalid")
+            return
+    
+    # Display results
+    if "result" in st.session_state:
+        render_results(st.session_state["result"])
 
 
 if __name__ == "__main__":
     st.set_page_config(
         layout="wide", 
-        page_title="Cold Email Generator", 
+        page_title="Cold Email Generator",
         page_icon="📧",
         initial_sidebar_state="expanded"
     )
     
     try:
-        chain = Chain()
-        portfolio = Portfolio()
+        if os.getenv("METRICS_PORT"):
+            start_metrics_server(int(os.getenv("METRICS_PORT")))
+        chain = get_chain()
+        portfolio = get_portfolio()
         create_app(chain, portfolio)
     except Exception as e:
         st.error(f"❌ Failed to initialize application: {str(e)}")
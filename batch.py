@@ -0,0 +1,386 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from chains import Chain
+from portfolio import Portfolio
+from fetcher import get_fetcher, is_valid_url
+from condense import condense_job_text, DEFAULT_TOKEN_BUDGET
+from analysis import PostingAnalyzer
+from checkpoint import BatchCheckpoint, export_results
+from dedup import NearDuplicateIndex
+from tracing import tracer
+from scheduler import call_priority, PRIORITY_BATCH
+from service import GenerationClient
+
+
+def read_urls(path: str) -> List[str]:
+    """Read job posting URLs from a file, one per line (blank lines and # comments are skipped)"""
+    urls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                urls.append(line)
+    return urls
+
+
+class BatchRunner:
+    def __init__(self, chain, portfolio, fetch_concurrency=16, llm_concurrency=4, n_results=3, full_package=False,
+                 token_budget=DEFAULT_TOKEN_BUDGET, fetcher=None, n_subjects=3, n_variants=1, analysis_cache=None,
+                 deduplicate=False, dedup_threshold=0.8, checkpoint=None):
+        """Run the fetch -> requirements -> portfolio -> email pipeline for many URLs with bounded concurrency
+
+        With ``deduplicate``, a posting whose condensed text is a near-duplicate of one
+        already in this run reuses that posting's result instead of calling the LLM.
+        With a ``checkpoint`` (BatchCheckpoint), stage outputs are saved as they finish,
+        postings completed in an earlier run are skipped and the rest resume mid-pipeline.
+        """
+        self.fetcher = fetcher if fetcher is not None else get_fetcher()
+        self.chain = chain
+        self.portfolio = portfolio
+        self.fetch_concurrency = fetch_concurrency
+        self.llm_concurrency = llm_concurrency
+        self.n_results = n_results
+        self.full_package = full_package
+        self.token_budget = token_budget
+        self.n_subjects = n_subjects
+        self.n_variants = n_variants
+        self.analyzer = PostingAnalyzer(chain, portfolio, cache=analysis_cache, n_results=n_results)
+        self.dedup_index = NearDuplicateIndex(threshold=dedup_threshold) if deduplicate else None
+        self._dedup_results = {}
+        self.checkpoint = checkpoint
+
+    def _fetch(self, url: str) -> str:
+        """Fetch the job posting text for a single URL"""
+        raw_text = self.fetcher.load_text(url)
+        if not raw_text:
+            raise ValueError("Could not fetch content from the URL")
+        return raw_text
+
+    def _fetch_checkpointed(self, url: str) -> str:
+        """Fetched text from the checkpoint, or fetch it and save it there"""
+        raw_text = self.checkpoint.get_stage(url, "fetch")
+        if raw_text is None:
+            raw_text = self._fetch(url)
+            self.checkpoint.save_stage(url, "fetch", raw_text)
+        return raw_text
+
+    async def _analyze(self, url: str, job_text: str) -> Dict[str, Any]:
+        """Posting analysis from the checkpoint, or run it and save it there"""
+        if self.checkpoint is not None:
+            analysis = self.checkpoint.get_stage(url, "analysis")
+            if analysis is not None:
+                return analysis
+
+        async with self._llm_slots:
+            analysis = await self.analyzer.aanalyze(job_text)
+        # Like the analysis cache, a failed requirements extraction is retried next time
+        if self.checkpoint is not None and analysis["requirements"] is not None:
+            self.checkpoint.save_stage(url, "analysis", analysis)
+        return analysis
+
+    async def _find_duplicate(self, url: str, job_text: str) -> Optional[Dict[str, Any]]:
+        """Result of an earlier near-duplicate posting, waiting for it if still in progress
+
+        If there is none, this URL is indexed so later duplicates can wait on it instead.
+        """
+        with tracer.span("dedup") as span:
+            signature = self.dedup_index.hasher.signature(job_text)
+            if signature is None:
+                return None
+
+            match = self.dedup_index.query(signature)
+            if match is None:
+                self.dedup_index.add(url, signature)
+                self._dedup_results[url] = asyncio.get_running_loop().create_future()
+                return None
+
+            original_url, similarity = match
+            span.set("duplicate_of", original_url)
+            original = await asyncio.shield(self._dedup_results[original_url])
+            if original["status"] != "ok":
+                return None
+            return dict(original, similarity=round(similarity, 3))
+
+    def _index_resumed(self, url: str, record: Dict[str, Any]):
+        """Index a posting completed in an earlier run so its near-duplicates in this run reuse it
+
+        The condensed text is rebuilt from the checkpointed page, so this costs no fetch or LLM call.
+        """
+        raw_text = self.checkpoint.get_stage(url, "fetch")
+        if raw_text is None:
+            return
+        signature = self.dedup_index.hasher.signature(condense_job_text(raw_text, self.token_budget)["text"])
+        if signature is None or self.dedup_index.query(signature) is not None:
+            return
+        self.dedup_index.add(url, signature)
+        self._dedup_results[url] = asyncio.get_running_loop().create_future()
+        self._dedup_results[url].set_result(record)
+
+    def _resolve_duplicates(self, url: str, record: Dict[str, Any]):
+        """Hand a finished result to any near-duplicates waiting on this URL"""
+        future = self._dedup_results.get(url)
+        if future is not None and not future.done():
+            future.set_result(record)
+
+    async def process_url(self, url: str, full_package: Optional[bool] = None,
+                          priority: Optional[int] = None) -> Dict[str, Any]:
+        """Run the full pipeline for one URL and return a JSON-serialisable result record
+
+        ``full_package`` overrides the runner's setting for this URL, and ``priority`` the
+        scheduler priority of its LLM calls (the service runs app and batch jobs side by side).
+        """
+        if priority is not None:
+            token = call_priority.set(priority)
+            try:
+                return await self.process_url(url, full_package)
+            finally:
+                call_priority.reset(token)
+
+        if self.checkpoint is not None:
+            done = self.checkpoint.completed(url)
+            if done is not None:
+                if self.dedup_index is not None:
+                    self._index_resumed(url, done)
+                return dict(done, resumed=True)
+
+        started = time.perf_counter()
+        record = {"url": url, "status": "ok", "skills": [], "links": [], "email": None, "error": None}
+
+        with tracer.span("pipeline", url=url) as pipeline_span:
+            record["trace_id"] = pipeline_span.trace_id
+            try:
+                if not is_valid_url(url):
+                    raise ValueError("Invalid URL")
+
+                # Step 1: Fetch job posting (I/O bound, limited separately from the LLM stage)
+                async with self._fetch_slots:
+                    with tracer.span("fetch"):
+                        fetch = self._fetch if self.checkpoint is None else self._fetch_checkpointed
+                        raw_text = await asyncio.to_thread(fetch, url)
+
+                # Step 2: Condense the posting, extract requirements and find relevant links
+                with tracer.span("condense") as span:
+                    condensed = condense_job_text(raw_text, self.token_budget)
+                    span.set("tokens_before", condensed["tokens_before"])
+                    span.set("tokens_after", condensed["tokens_after"])
+                job_text = condensed["text"]
+                record["tokens_before"] = condensed["tokens_before"]
+                record["tokens_after"] = condensed["tokens_after"]
+
+                if self.dedup_index is not None:
+                    original = await self._find_duplicate(url, job_text)
+                    if original is not None:
+                        for key in ("skills", "requirements", "links", "email", "email_variants", "subject_lines",
+                                    "package_mode"):
+                            if key in original:
+                                record[key] = original[key]
+                        record["duplicate_of"] = original["url"]
+                        record["similarity"] = original["similarity"]
+                        return record
+
+                analysis = await self._analyze(url, job_text)
+                relevant_links = analysis["relevant_links"]
+                record["skills"] = analysis["skills"]
+                record["requirements"] = analysis["requirements"]
+                record["links"] = relevant_links
+
+                # Step 3: Generate email (optionally with subject lines in the same prompt; requirements
+                # from the analysis are reused, and only asked for again if its extraction failed).
+                # A failed email raises, so the record is an error and a checkpointed run retries it
+                async with self._llm_slots:
+                    with tracer.span("email"):
+                        if self.full_package if full_package is None else full_package:
+                            record.update(await self.chain.agenerate_package(
+                                job_text, relevant_links, self.n_subjects, self.n_variants, raise_errors=True,
+                                requirements=analysis["requirements"]
+                            ))
+                        else:
+                            record["email"] = await self.chain.awrite_mail(job_text, relevant_links,
+                                                                           raise_errors=True)
+                if not record["email"]:
+                    raise ValueError("No email was generated")
+
+            except asyncio.CancelledError:
+                record["status"] = "error"
+                record["error"] = "Cancelled"
+                raise
+
+            except Exception as e:
+                logging.error(f"Batch item failed for {url}: {e}")
+                pipeline_span.error = f"{type(e).__name__}: {e}"
+                record["status"] = "error"
+                record["error"] = f"{type(e).__name__}: {e}"
+
+            finally:
+                record["elapsed_s"] = round(time.perf_counter() - started, 3)
+                if self.dedup_index is not None:
+                    self._resolve_duplicates(url, record)
+                if self.checkpoint is not None and record["error"] != "Cancelled":
+                    self.checkpoint.save_result(record)
+
+        return record
+
+    async def start(self):
+        """Set up concurrency limits on the running event loop and sync the portfolio"""
+        self._fetch_slots = asyncio.Semaphore(self.fetch_concurrency)
+        self._llm_slots = asyncio.Semaphore(self.llm_concurrency)
+
+        # Fetching and portfolio queries still block, so they run in threads; LLM calls share the event loop
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.fetch_concurrency + 1))
+
+        self.portfolio.load_portfolio()
+
+    async def run(self, urls: List[str], out) -> Dict[str, int]:
+        """Process all URLs, writing one JSONL line to ``out`` as each one finishes (resumed ones are not rewritten)"""
+        await self.start()
+
+        stats = {"total": len(urls), "ok": 0, "error": 0, "resumed": 0}
+        tasks = [asyncio.create_task(self.process_url(url)) for url in urls]
+        for finished in asyncio.as_completed(tasks):
+            record = await finished
+            stats[record["status"]] += 1
+            # Written to the output by the run that completed it
+            if record.get("resumed"):
+                stats["resumed"] += 1
+                continue
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            logging.info(f"[{stats['ok'] + stats['error']}/{stats['total']}] {record['status']} {record['url']}")
+        return stats
+
+
+def run_via_service(client, urls: List[str], out, full_package=False, timeout=3600) -> Dict[str, int]:
+    """Submit all URLs to the generation service at batch priority and write each result as it is collected
+
+    The service then serves app requests first, and its LLM calls share one rate-limit
+    budget with theirs instead of this process assuming the whole budget for itself.
+    """
+    stats = {"total": len(urls), "ok": 0, "error": 0, "resumed": 0}
+    jobs = []
+    for url in urls:
+        try:
+            jobs.append((url, client.submit(url, full_package, priority="batch")["id"]))
+        except Exception as e:
+            logging.error(f"Could not submit {url}: {e}")
+            jobs.append((url, None))
+
+    deadline = time.monotonic() + timeout
+    for url, job_id in jobs:
+        try:
+            if job_id is None:
+                raise ValueError("Rejected by the generation service")
+            record = client.wait(job_id, timeout=max(deadline - time.monotonic(), 1))
+        except Exception as e:
+            record = {"url": url, "status": "error", "error": f"{type(e).__name__}: {e}"}
+        stats[record["status"]] += 1
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        logging.info(f"[{stats['ok'] + stats['error']}/{stats['total']}] {record['status']} {record['url']}")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate cold emails for a file of job posting URLs")
+    parser.add_argument("urls_file", help="File with one job posting URL per line")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output path (default: stdout)")
+    parser.add_argument("--fetch-concurrency", type=int, default=16, help="Max concurrent page fetches")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="Max concurrent LLM calls")
+    parser.add_argument("--n-results", type=int, default=3, help="Portfolio projects per email")
+    parser.add_argument("--full-package", action="store_true",
+                        help="Also generate subject lines and job requirements for each posting")
+    parser.add_argument("--subjects", type=int, default=3, help="Subject line candidates with --full-package")
+    parser.add_argument("--variants", type=int, default=1, help="Email variants with --full-package")
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help="Max tokens of job posting text sent to the LLM")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Generate every posting even if it is a near-duplicate of another in the file")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8,
+                        help="Estimated text similarity above which postings count as duplicates")
+    parser.add_argument("--trace-out", help="Write per-stage trace spans to this JSONL file when done")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port while running")
+    parser.add_argument("--checkpoint",
+                        help="SQLite file for per-stage progress; rerunning with it skips completed postings")
+    parser.add_argument("--export", help="Write all checkpointed results to this .csv or .parquet file when done")
+    parser.add_argument("--service",
+                        help="Generation service URL; jobs are submitted there at batch priority instead of run here")
+    args = parser.parse_args(argv)
+    if args.export and not args.checkpoint:
+        parser.error("--export needs --checkpoint")
+    if args.service and args.checkpoint:
+        parser.error("--checkpoint applies to local runs, not --service")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+
+    if args.metrics_port:
+        tracer.serve_metrics(args.metrics_port)
+
+    if args.service:
+        urls = read_urls(args.urls_file)
+        out = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")
+        try:
+            stats = run_via_service(GenerationClient(args.service), urls, out, args.full_package)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        logging.info(f"Done: {stats['ok']} ok, {stats['error']} failed, {stats['total']} total")
+        return 0 if stats["error"] == 0 else 1
+
+    checkpoint = None
+    if args.checkpoint:
+        # Saved stages are only valid for the settings that produced them
+        checkpoint = BatchCheckpoint(args.checkpoint, params={
+            "n_results": args.n_results, "full_package": args.full_package, "subjects": args.subjects,
+            "variants": args.variants, "token_budget": args.token_budget
+        })
+
+    urls = read_urls(args.urls_file)
+    # Only orders this run's calls among themselves; the rate-limit buckets are this process's own
+    runner = BatchRunner(
+        Chain(priority=PRIORITY_BATCH),
+        Portfolio(),
+        fetch_concurrency=args.fetch_concurrency,
+        llm_concurrency=args.llm_concurrency,
+        n_results=args.n_results,
+        full_package=args.full_package,
+        token_budget=args.token_budget,
+        n_subjects=args.subjects,
+        n_variants=args.variants,
+        deduplicate=not args.no_dedup,
+        dedup_threshold=args.dedup_threshold,
+        checkpoint=checkpoint,
+    )
+
+    out = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")
+    try:
+        stats = asyncio.run(runner.run(urls, out))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if args.trace_out:
+            tracer.export_jsonl(args.trace_out)
+
+    logging.info(f"Done: {stats['ok']} ok ({stats['resumed']} from an earlier run), {stats['error']} failed, "
+                 f"{stats['total']} total")
+    if args.export:
+        export_results(checkpoint, args.export)
+    if getattr(runner.portfolio, "embedding_cache", None) is not None:
+        embeddings = runner.portfolio.embedding_cache.stats()
+        logging.info(f"Embedding cache: {embeddings['hit_rate']:.0%} hit rate "
+                     f"({embeddings['memory_hits']} memory, {embeddings['disk_hits']} disk, {embeddings['misses']} misses)")
+    if hasattr(runner.portfolio, "query_cache_stats"):
+        queries = runner.portfolio.query_cache_stats()
+        logging.info(f"Portfolio query cache: {queries['hit_rate']:.0%} hit rate "
+                     f"({queries['hits']} hits, {queries['misses']} misses)")
+    return 0 if stats["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
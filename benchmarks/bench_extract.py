@@ -0,0 +1,127 @@
+"""HTML-to-text benchmark: streaming JobPageExtractor vs. BeautifulSoup get_text (the previous loader).
+
+Reports CPU time per page and peak traced memory for each extractor over a corpus of
+saved job pages. Without --corpus, a synthetic corpus is used: the pipeline benchmark's
+pages plus Greenhouse-, Lever- and Workday-style pages with inline scripts and
+application forms around the description.
+
+BeautifulSoup is only needed here: pip install -r benchmarks/requirements.txt
+
+Usage:
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --corpus saved_pages/ --repeat 5
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from extractor import extract_job_page
+from job_server import make_corpus, make_job_page
+
+_SCRIPT = "window.__APP_STATE__ = " + "{" + ",".join(f'"k{i}": "{"x" * 40}"' for i in range(3000)) + "};"
+
+
+def _description(index):
+    """The posting part of a pipeline benchmark page, cycling through its sizes"""
+    body = make_job_page(index, ("small", "medium", "large")[index % 3])
+    return body[body.index('<div class="job">'):body.index("<h2>Similar jobs</h2>")]  # ends with the job's </div>
+
+
+def _form(fields):
+    return "<form>" + "".join(f'<label>Question {i}</label><input name="q{i}"><select name="s{i}">'
+                              + "".join(f"<option>Option {j}</option>" for j in range(20)) + "</select>"
+                              for i in range(fields)) + "</form>"
+
+
+def ats_pages(count=6):
+    """(name, html) pairs imitating the markup of the supported applicant tracking systems"""
+    pages = []
+    for i in range(count):
+        description = _description(i)
+        kind = ("greenhouse", "lever", "workday")[i % 3]
+        if kind == "greenhouse":
+            html = (f"<html><head><title>Job Application for Engineer {i} at Acme</title><script>{_SCRIPT}</script>"
+                    f'</head><body><div id="app_body"><h1 class="app-title">Engineer {i}</h1>'
+                    f'<span class="company-name">at Acme</span><div id="content">{description}</div>'
+                    f'<div id="application">{_form(40)}</div></div></body></html>')
+        elif kind == "lever":
+            html = (f"<html><head><title>Initech - Engineer {i}</title><style>{'.c{color:red}' * 5000}</style></head>"
+                    f'<body><div class="content-wrapper posting-page"><div class="posting-headline">'
+                    f"<h2>Engineer {i}</h2></div>{description}</div>{_form(40)}<script>{_SCRIPT}</script>"
+                    f"</body></html>")
+        else:
+            html = ('<html><head><script type="application/ld+json">{"@type": "JobPosting", "title": "Engineer '
+                    f'{i}", "hiringOrganization": {{"name": "Globex"}}}}</script><script>{_SCRIPT}</script></head>'
+                    f'<body><div data-automation-id="jobPostingHeader">Engineer {i}</div>'
+                    f'<div data-automation-id="jobPostingDescription">{description}</div>'
+                    f"<div>{_form(60)}</div></body></html>")
+        pages.append((f"{kind}-{i}", html))
+    return pages
+
+
+def load_corpus(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.htm*"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def beautifulsoup_text(html):
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+def streaming_text(html):
+    return extract_job_page(html)["text"]
+
+
+def measure(extract, pages, repeat):
+    """Mean CPU ms per page and the largest peak traced memory (KB) for any single page"""
+    cpu = 0.0
+    for _ in range(repeat):
+        started = time.process_time()
+        for _, html in pages:
+            extract(html)
+        cpu += time.process_time() - started
+
+    peak = 0
+    for _, html in pages:
+        tracemalloc.start()
+        extract(html)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return cpu / repeat / len(pages) * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark job page text extraction")
+    parser.add_argument("--corpus", help="Directory of saved .html pages (default: synthetic corpus)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.corpus:
+        groups = {"corpus": load_corpus(args.corpus)}
+    else:
+        groups = {"generic": make_corpus(12), "ats": ats_pages()}
+
+    print(f"{'pages':<10} {'n':>3} {'avg KB':>8} {'extractor':<15} {'CPU ms/page':>12} {'peak MB':>9}")
+    for name, pages in groups.items():
+        if not pages:
+            print(f"{name}: no pages found")
+            continue
+        size = sum(len(html) for _, html in pages) / len(pages) / 1024
+        for label, extract in (("beautifulsoup", beautifulsoup_text), ("streaming", streaming_text)):
+            cpu_ms, peak_kb = measure(extract, pages, args.repeat)
+            print(f"{name:<10} {len(pages):>3} {size:>8.0f} {label:<15} {cpu_ms:>12.1f} {peak_kb / 1024:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
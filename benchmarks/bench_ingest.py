@@ -0,0 +1,105 @@
+"""Portfolio ingest benchmark: rows/s and peak RSS for synthetic catalogs of growing size.
+
+Each size runs in a fresh process with a cheap hashing embedding function, so the
+numbers reflect CSV streaming, batching and Chroma writes rather than the ONNX model.
+Peak RSS should stay roughly flat as the catalog grows (Chroma's own index aside).
+
+Usage:
+    python benchmarks/bench_ingest.py
+    python benchmarks/bench_ingest.py --rows 1000 10000 100000
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_RUNNER = """
+import json, resource, sys, time, zlib
+sys.path.insert(0, {root!r})
+import numpy as np
+from chromadb.api.types import EmbeddingFunction
+from portfolio import Portfolio
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = np.zeros(64, dtype=np.float32)
+            for word in text.lower().split():
+                vector[zlib.crc32(word.encode()) % 64] += 1
+            vectors.append(vector)
+        return vectors
+
+    @staticmethod
+    def name():
+        return "bench-hashing"
+
+    def get_config(self):
+        return {{}}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashingEmbeddingFunction()
+
+portfolio = Portfolio({csv_path!r}, persist_directory={persist!r}, embedding_function=HashingEmbeddingFunction(),
+                      embedding_cache_directory={embedding_cache!r})
+started = time.perf_counter()
+portfolio.load_portfolio(chunk_size={chunk_size}, batch_size={batch_size})
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "stored": portfolio.collection.count(),
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}}))
+"""
+
+
+def write_catalog(path, rows):
+    """Synthetic portfolio CSV with ``rows`` distinct projects"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Techstack", "Links", "Title", "Description"])
+        for i in range(rows):
+            writer.writerow([f"Python, Service{i % 97}, Cloud{i % 13}", f"https://example.com/case/{i}",
+                             f"Case study {i}", f"Delivered project {i} for client {i % 311} in {i % 7} months"])
+
+
+def run(rows, chunk_size, batch_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "portfolio.csv")
+        write_catalog(csv_path, rows)
+        script = _RUNNER.format(root=ROOT, csv_path=csv_path, persist=os.path.join(tmp, "vectorstore"),
+                                embedding_cache=os.path.join(tmp, "embedding_cache"),
+                                chunk_size=chunk_size, batch_size=batch_size)
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+    result["rows_per_second"] = round(rows / result["seconds"], 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming portfolio ingest")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'seconds':>9} {'rows/s':>9} {'peak RSS MB':>12}")
+    for rows in args.rows:
+        result = run(rows, args.chunk_size, args.batch_size)
+        if result["stored"] != rows:
+            print(f"warning: stored {result['stored']} of {rows} rows")
+        print(f"{rows:>8} {result['seconds']:>9.1f} {result['rows_per_second']:>9} {result['peak_rss_mb']:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Offline pipeline benchmark: fake LLM + local job-posting server, no Groq or internet needed.
+
+Runs the app's pipeline stages (fetch, condense, requirements analysis, email) per
+posting and reports p50/p95 per stage, end-to-end throughput of the batch runner at
+several concurrency levels, and peak RSS. Results are compared with a saved baseline.
+The portfolio is queried through Chroma with a local hashing embedder (--embedding
+default uses Chroma's own model, which has to be downloadable); the vector store and
+embedding cache live in a temporary directory.
+
+Usage:
+    python benchmarks/bench_pipeline.py                    # run and compare with baseline
+    python benchmarks/bench_pipeline.py --save-baseline    # run and overwrite the baseline
+"""
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis import PostingAnalyzer
+from batch import BatchRunner
+from chains import Chain
+from condense import condense_job_text
+from fake_embeddings import HashingEmbeddingFunction
+from fake_llm import FakeChatModel
+from fetcher import Fetcher, PageCache
+from job_server import start_job_server
+from llm_cache import LLMCache
+from portfolio import Portfolio
+from scheduler import RateLimitScheduler
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+STAGES = ["fetch", "condense", "analysis", "email", "total"]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def make_fetcher():
+    """Fetcher with a throwaway in-memory page cache that always goes to the server"""
+    return Fetcher(cache=PageCache(":memory:"), max_age=0)
+
+
+def run_stages(urls, chain, portfolio):
+    """Time each pipeline stage for every posting, one posting at a time"""
+    fetcher = make_fetcher()
+    analyzer = PostingAnalyzer(chain, portfolio, cache=LLMCache(enabled=False))
+    timings = {stage: [] for stage in STAGES}
+
+    for url in urls:
+        started = time.perf_counter()
+
+        t = time.perf_counter()
+        raw_text = fetcher.load_text(url)
+        timings["fetch"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        job_text = condense_job_text(raw_text)["text"]
+        timings["condense"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        links = analyzer.analyze(job_text)["relevant_links"]
+        timings["analysis"].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        chain.write_mail(job_text, links)
+        timings["email"].append(time.perf_counter() - t)
+
+        timings["total"].append(time.perf_counter() - started)
+
+    return {
+        stage: {
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2)
+        }
+        for stage, values in timings.items()
+    }
+
+
+def run_throughput(urls, chain, portfolio, levels):
+    """Postings per second through BatchRunner at each LLM concurrency level"""
+    throughput = {}
+    for level in levels:
+        runner = BatchRunner(chain, portfolio, fetch_concurrency=max(4, level), llm_concurrency=level,
+                             fetcher=make_fetcher(), analysis_cache=LLMCache(enabled=False))
+        started = time.perf_counter()
+        stats = asyncio.run(runner.run(urls, io.StringIO()))
+        elapsed = time.perf_counter() - started
+        throughput[str(level)] = round(stats["total"] / elapsed, 2)
+        if stats["error"]:
+            logging.warning(f"{stats['error']} postings failed at concurrency {level}")
+    return throughput
+
+
+def compare(results, baseline, tolerance):
+    """List of human-readable regressions against the baseline"""
+    regressions = []
+    if baseline.get("config") != results["config"]:
+        logging.warning("Benchmark config differs from the baseline; comparison may not be meaningful")
+
+    for stage, current in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            # Ignore sub-millisecond noise
+            if current[key] > before[key] * (1 + tolerance) and current[key] - before[key] > 1.0:
+                regressions.append(f"{stage} {key}: {before[key]} -> {current[key]}")
+
+    for level, current in results["throughput"].items():
+        before = baseline.get("throughput", {}).get(level)
+        if before and current < before * (1 - tolerance):
+            regressions.append(f"throughput@{level}: {before} -> {current} postings/s")
+
+    before = baseline.get("peak_rss_mb")
+    if before and results["peak_rss_mb"] > before * (1 + tolerance):
+        regressions.append(f"peak_rss_mb: {before} -> {results['peak_rss_mb']}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the cold email pipeline")
+    parser.add_argument("--pages", type=int, default=30, help="Number of job pages in the local corpus")
+    parser.add_argument("--latency", type=float, default=0.3, help="Fake LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="Fake LLM output rate")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--embedding", choices=["hashing", "default"], default="hashing",
+                        help="Portfolio embedding function: offline hashing embedder or Chroma's default model")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+
+    server, urls = start_job_server(args.pages)
+    llm = FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second)
+    # Limits high enough that the fake LLM, not the Groq rate limits, bounds throughput
+    scheduler = RateLimitScheduler(requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9)
+    chain = Chain(use_cache=False, llm=llm, scheduler=scheduler)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embedding_function = HashingEmbeddingFunction() if args.embedding == "hashing" else None
+        portfolio = Portfolio(persist_directory=os.path.join(tmp, "vectorstore"),
+                              embedding_function=embedding_function,
+                              embedding_cache_directory=os.path.join(tmp, "embedding_cache"))
+        portfolio.load_portfolio()
+        if getattr(portfolio, "use_fallback", False):
+            logging.warning("Chroma is unavailable; the portfolio stage measures the BM25 fallback")
+
+        results = {
+            "config": {
+                "pages": args.pages,
+                "latency": args.latency,
+                "tokens_per_second": args.tokens_per_second,
+                "embedding": args.embedding,
+                "portfolio_backend": "fallback" if getattr(portfolio, "use_fallback", False) else "chroma"
+            },
+            "stages": run_stages(urls, chain, portfolio),
+            "throughput": run_throughput(urls, chain, portfolio, args.concurrency)
+        }
+
+    server.shutdown()
+    results["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    print(f"{'stage':<10} {'p50 ms':>10} {'p95 ms':>10}")
+    for stage, values in results["stages"].items():
+        print(f"{stage:<10} {values['p50_ms']:>10} {values['p95_ms']:>10}")
+    for level, rate in results["throughput"].items():
+        print(f"throughput @ concurrency {level}: {rate} postings/s")
+    print(f"peak RSS: {results['peak_rss_mb']} MB")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+
+    if regressions:
+        print("REGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Micro-benchmark: skills.extract_skills_from_text vs. the original substring scan.
+
+Usage: python benchmarks/bench_skills.py [--words 2000 20000 100000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from skills import STOPWORDS, SKILL_ALIASES, extract_skills_from_text
+
+LEGACY_TECH_KEYWORDS = [
+    'python', 'javascript', 'java', 'react', 'nodejs', 'sql', 'aws', 'docker',
+    'kubernetes', 'machine learning', 'data science', 'frontend', 'backend',
+    'fullstack', 'devops', 'api', 'database', 'html', 'css', 'git', 'agile',
+    'scrum', 'tensorflow', 'pytorch', 'django', 'flask', 'spring', 'mongodb',
+    'postgresql', 'redis', 'elasticsearch', 'microservices', 'cloud', 'azure',
+    'gcp', 'ci/cd', 'testing', 'automation', 'analytics', 'visualization'
+]
+
+
+def legacy_extract_skills_from_text(text):
+    """The extractor as it was in app.py: one substring scan per keyword"""
+    text_lower = text.lower()
+    found_skills = []
+    for skill in LEGACY_TECH_KEYWORDS:
+        if skill in text_lower:
+            found_skills.append(skill)
+
+    words = re.findall(r'\b[a-zA-Z]{3,}\b', text_lower)
+    common_words = set(STOPWORDS)  # the original rebuilt its ~1,000-word literal set per call
+    extracted_words = list(set([word for word in words if word not in common_words]))[:15]
+    all_skills = found_skills + extracted_words
+    return list(set(all_skills))[:20]
+
+
+def make_posting(n_words, seed=0):
+    """Synthetic job posting: common words, a long tail of rarer words, and ~2% skill mentions"""
+    rng = random.Random(seed)
+    common = sorted(STOPWORDS) + ['engineer', 'platform', 'customers', 'digital', 'javascript', 'ownership']
+    rare = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10))) for _ in range(3000)]
+    aliases = [alias for forms in SKILL_ALIASES.values() for alias in forms]
+    words = []
+    for _ in range(n_words):
+        roll = rng.random()
+        if roll < 0.02:
+            words.append(rng.choice(aliases))
+        elif roll < 0.3:
+            words.append(rng.choice(rare) + rng.choice(["", "", "", ",", "."]))
+        else:
+            words.append(rng.choice(common))
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, nargs="+", default=[2000, 20000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'words':>8} {'legacy ms':>10} {'new ms':>10} {'speedup':>8}")
+    for n_words in args.words:
+        text = make_posting(n_words)
+        legacy = min(timeit.repeat(lambda: legacy_extract_skills_from_text(text), number=1, repeat=args.repeat))
+        new = min(timeit.repeat(lambda: extract_skills_from_text(text), number=1, repeat=args.repeat))
+        print(f"{n_words:>8} {legacy * 1000:>10.2f} {new * 1000:>10.2f} {legacy / new:>7.1f}x")
+
+    sample = make_posting(500, seed=1)
+    assert extract_skills_from_text(sample) == extract_skills_from_text(sample), "output must be deterministic"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Cold-start benchmark: time imports and object construction in fresh interpreters.
+
+Each scenario runs in a new Python process so nothing is already imported or cached,
+which is what a container cold start or a CLI invocation pays. The report lists the
+median wall time per scenario and which heavy dependencies ended up imported.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["streamlit", "chromadb", "pandas", "langchain_groq", "langchain_community", "onnxruntime"]
+
+SCENARIOS = {
+    "import chains": "import chains",
+    "import portfolio": "import portfolio",
+    "import batch": "import batch",
+    "import app": "import app",
+    "Portfolio() + load": (
+        "import tempfile, portfolio\n"
+        "with tempfile.TemporaryDirectory() as d:\n"
+        "    portfolio.Portfolio(persist_directory=d).load_portfolio()"
+    ),
+}
+
+_RUNNER = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_scenario(code, repeat):
+    """Median seconds over ``repeat`` fresh processes, plus the heavy modules that were imported"""
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        script = _RUNNER.format(root=ROOT, code=code, heavy=HEAVY_MODULES)
+        output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True,
+                                check=True, env=dict(os.environ, GROQ_API_KEY=os.getenv("GROQ_API_KEY", "x")))
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        loaded = result["loaded"]
+    return {"median_ms": round(statistics.median(timings) * 1000, 1), "loaded": loaded}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import and construction time")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per scenario")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {name: run_scenario(code, args.repeat) for name, code in SCENARIOS.items()}
+
+    print(f"{'scenario':<22} {'median ms':>10}  heavy modules loaded")
+    for name, result in results.items():
+        print(f"{name:<22} {result['median_ms']:>10}  {', '.join(result['loaded']) or '-'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
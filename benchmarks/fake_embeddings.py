@@ -0,0 +1,38 @@
+"""Deterministic offline stand-in for Chroma's default embedding model."""
+import zlib
+from typing import Any, Dict
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Embeds text as a unit-length bag of hashed words
+
+    Needs no model download, so the Chroma query path can be benchmarked offline. Vectors
+    are normalised like the default model's, so L2 and cosine rankings agree.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        embeddings = []
+        for text in input:
+            vector = np.zeros(self.dimensions, dtype=np.float32)
+            for word in text.lower().split():
+                vector[zlib.crc32(word.encode("utf-8")) % self.dimensions] += 1.0
+            norm = np.linalg.norm(vector)
+            embeddings.append(vector / norm if norm else vector)
+        return embeddings
+
+    @staticmethod
+    def name() -> str:
+        return "bench-hashing"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(config.get("dimensions", 384))
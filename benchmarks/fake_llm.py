@@ -0,0 +1,102 @@
+"""Deterministic stand-in for ChatGroq with configurable latency and token rate."""
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_VOCABULARY = (
+    "we help teams ship reliable python services on aws with docker and kubernetes "
+    "our engineers have delivered data platforms machine learning pipelines and apis "
+    "for startups and enterprises let us schedule a short call next week to discuss"
+).split()
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that sleeps like a remote LLM and returns text derived from the prompt
+
+    Time to first token is ``latency`` seconds, after which ``output_tokens`` words are
+    produced at ``tokens_per_second``. The same prompt always yields the same reply.
+    """
+
+    model_name: str = "fake-llm"
+    temperature: float = 0.0
+    max_tokens: int = 2000
+    latency: float = 0.3
+    tokens_per_second: float = 400.0
+    output_tokens: int = 150
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "".join(str(m.content) for m in messages)
+        seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        return [_VOCABULARY[(seed + i * 7) % len(_VOCABULARY)] + " " for i in range(self.output_tokens)]
+
+    def _usage(self, messages: List[BaseMessage]) -> dict:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": input_tokens + self.output_tokens
+        }
+
+    def _json_reply(self, messages: List[BaseMessage]) -> str:
+        """JSON-mode reply: a combined package if the prompt asks for one, else extracted requirements"""
+        prompt = "".join(str(m.content) for m in messages)
+        words = [w.strip() for w in self._reply_tokens(messages)]
+        requirements = {"job_title": "engineer", "key_requirements": words[:5], "soft_skills": ["communication"],
+                        "industry": "software"}
+        if '"emails"' not in prompt:
+            return json.dumps(requirements)
+        return json.dumps({
+            "requirements": requirements,
+            "subject_lines": [" ".join(words[i:i + 5]) for i in range(0, 15, 5)],
+            "emails": [" ".join(words)]
+        })
+
+    def _result(self, messages: List[BaseMessage], json_mode: bool = False) -> ChatResult:
+        usage = self._usage(messages)
+        message = AIMessage(
+            content=self._json_reply(messages) if json_mode else "".join(self._reply_tokens(messages)),
+            usage_metadata=usage,
+            response_metadata={
+                "model_name": self.model_name,
+                "token_usage": {
+                    "prompt_tokens": usage["input_tokens"],
+                    "completion_tokens": usage["output_tokens"],
+                    "total_tokens": usage["total_tokens"]
+                }
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency + self.output_tokens / self.tokens_per_second)
+        return self._result(messages, "response_format" in kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency + self.output_tokens / self.tokens_per_second)
+        return self._result(messages, "response_format" in kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._reply_tokens(messages):
+            time.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._reply_tokens(messages):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
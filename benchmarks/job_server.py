@@ -0,0 +1,89 @@
+"""Local HTTP server serving a deterministic corpus of realistic job posting pages."""
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+
+PAGE_SIZES = {"small": 4_000, "medium": 40_000, "large": 250_000}
+
+_TITLES = ["Senior Python Engineer", "Data Engineer", "Machine Learning Engineer", "Full Stack Developer",
+           "DevOps Engineer", "Backend Engineer (Node.js)", "Frontend Engineer (React)", "Platform Engineer"]
+_COMPANIES = ["Acme Logistics", "Northwind Health", "Globex Fintech", "Initech Cloud", "Umbrella Retail"]
+_SKILLS = ["Python", "Django", "FastAPI", "AWS", "Docker", "Kubernetes", "PostgreSQL", "Redis", "Kafka",
+           "React", "TypeScript", "Node.js", "Terraform", "CI/CD", "machine learning", "PyTorch", "SQL",
+           "GCP", "Airflow", "Spark", "GraphQL", "microservices"]
+_FILLER = ("Our mission is to make every shipment visible and every customer delighted. We are a remote "
+           "first team that values ownership, kindness and shipping small increments often. ").split()
+
+_NAV = "".join(f'<li><a href="/{item.lower()}">{item}</a></li>' for item in
+               ["Home", "Jobs", "Teams", "Locations", "Benefits", "Blog", "Contact"])
+_COOKIE = ('<div class="cookie-banner">We use cookies to improve your experience. '
+           '<button>Accept all</button><button>Reject all</button> See our privacy policy.</div>')
+_FOOTER = ('<footer><p>© 2025 All rights reserved.</p><p>Follow us on social media</p>'
+           '<p>Equal opportunity employer.</p></footer>')
+
+
+def make_job_page(index: int, size: str) -> str:
+    """Build one job posting page of roughly PAGE_SIZES[size] bytes"""
+    rng = random.Random(index)
+    title = rng.choice(_TITLES)
+    company = rng.choice(_COMPANIES)
+    skills = rng.sample(_SKILLS, 6)
+
+    responsibilities = "".join(f"<li>Design, build and operate services using {s}.</li>" for s in skills[:3])
+    requirements = "".join(f"<li>{rng.randint(2, 8)}+ years of experience with {s}.</li>" for s in skills)
+
+    parts = [
+        f"<html><head><title>{title} - {company}</title></head><body>",
+        f"<nav><ul>{_NAV}</ul></nav>", _COOKIE,
+        f'<div class="job"><h1 class="job-title">{title}</h1><div class="company">{company}</div>',
+        f"<h2>About the role</h2><p>{company} is hiring a {title} to join our platform team.</p>",
+        f"<h2>Responsibilities</h2><ul>{responsibilities}</ul>",
+        f"<h2>Requirements</h2><ul>{requirements}</ul>",
+        "<h2>About us</h2>",
+    ]
+
+    # Pad with company boilerplate until the page reaches the target size
+    target = PAGE_SIZES[size]
+    filler = []
+    length = sum(len(p) for p in parts)
+    while length < target:
+        paragraph = "<p>" + " ".join(rng.choice(_FILLER) for _ in range(60)) + "</p>"
+        filler.append(paragraph)
+        length += len(paragraph)
+    parts.extend(filler)
+
+    similar = "".join(f"<li>{rng.choice(_TITLES)} at {rng.choice(_COMPANIES)}</li>" for _ in range(10))
+    parts.append(f"</div><h2>Similar jobs</h2><ul>{similar}</ul>{_FOOTER}</body></html>")
+    return "".join(parts)
+
+
+def make_corpus(n_pages: int) -> List[Tuple[str, str]]:
+    """(path, html) pairs cycling through the page sizes"""
+    sizes = list(PAGE_SIZES)
+    return [(f"/jobs/{i}", make_job_page(i, sizes[i % len(sizes)])) for i in range(n_pages)]
+
+
+def start_job_server(n_pages: int = 30):
+    """Start a background HTTP server for the corpus; returns (server, urls)"""
+    pages = {path: html.encode("utf-8") for path, html in make_corpus(n_pages)}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    return server, [base + path for path in pages]
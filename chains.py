@@ -1,196 +1,653 @@
+import asyncio
+import json
+import re
+import time
 import os
-from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
 import logging
+from llm_cache import LLMCache
+from tracing import tracer, record_llm_usage
+from scheduler import get_scheduler, estimate_tokens, is_overloaded, call_priority, PRIORITY_INTERACTIVE
+from router import ModelRouter
+from condense import count_tokens
 
 load_dotenv()
 
+EXTRACT_PROMPT = PromptTemplate.from_template(
+    """
+    Analyze this job posting and extract the key requirements, skills, and company needs:
+    
+    {job_text}
+    
+    Return only a JSON object with these keys:
+    - company_name: Name of the hiring company
+    - job_title: Position title
+    - key_requirements: List of main technical requirements
+    - soft_skills: List of soft skills needed
+    - company_type: Type of company (startup, enterprise, etc.)
+    - industry: Industry sector
+    
+    Keep it concise and focused on the most important elements.
+    """
+)
+
+EMAIL_PROMPT = PromptTemplate.from_template(
+    """
+    You are Ahmed, a business development executive at TechFlow Solutions - an AI & software consulting company that helps businesses leverage cutting-edge technology to solve complex problems and drive growth.
+    
+    ### JOB POSTING:
+    {job_text}
+    
+    ### RELEVANT PORTFOLIO PROJECTS:
+    {links}
+    
+    ### INSTRUCTIONS:
+    Write a professional cold email that:
+    1. Shows you understand their specific needs from the job posting
+    2. Briefly explains how TechFlow Solutions can help
+    3. Naturally mentions 2-3 relevant portfolio projects as proof of capability
+    4. Keeps the tone professional but personable
+    5. Ends with a clear, specific call-to-action
+    6. Is concise (under 200 words)
+    
+    ### WRITING GUIDELINES:
+    - Address the hiring manager professionally
+    - Don't oversell or use too much jargon
+    - Focus on value proposition and results
+    - Make it feel personalized, not templated
+    - Include your contact information
+    - Use proper email formatting
+    
+    ### EMAIL:
+    """
+)
+
+REFINE_PROMPT = PromptTemplate.from_template(
+    """
+    Here's a cold email that was generated:
+    
+    {email_content}
+    
+    Please refine it based on this feedback:
+    {feedback}
+    
+    Return the improved version while maintaining the professional tone and structure.
+    """
+)
+
+SUBJECT_PROMPT = PromptTemplate.from_template(
+    """
+    Based on this job posting, generate 3 compelling email subject lines that would make a hiring manager want to open the email:
+    
+    {job_text}
+    
+    Guidelines:
+    - Keep them under 50 characters
+    - Make them specific and relevant
+    - Avoid spam words
+    - Show value proposition
+    
+    Return only the 3 subject lines, one per line.
+    """
+)
+
+PACKAGE_PROMPT = PromptTemplate.from_template(
+    """
+    You are Ahmed, a business development executive at TechFlow Solutions - an AI & software consulting company that helps businesses leverage cutting-edge technology to solve complex problems and drive growth.
+    
+    ### JOB POSTING:
+    {job_text}
+    
+    ### RELEVANT PORTFOLIO PROJECTS:
+    {links}
+    
+    ### TASK:
+    From this one job posting, produce:
+    1. The key requirements of the role
+    2. {n_subjects} compelling email subject lines (under 50 characters, specific, no spam words)
+    3. {n_variants} distinct cold email variant(s) that show you understand their needs, explain how
+       TechFlow Solutions can help, naturally mention 2-3 of the portfolio projects, and end with a
+       clear call-to-action. Keep each email professional, personable and under 200 words.
+    
+    ### OUTPUT:
+    Return only a JSON object with exactly these keys:
+    {{
+        "requirements": {{
+            "company_name": "...",
+            "job_title": "...",
+            "key_requirements": ["..."],
+            "soft_skills": ["..."],
+            "company_type": "...",
+            "industry": "..."
+        }},
+        "subject_lines": ["..."],
+        "emails": ["..."]
+    }}
+    """
+)
+
+# PACKAGE_PROMPT for when the requirements were already extracted (e.g. for portfolio retrieval)
+PACKAGE_NO_REQUIREMENTS_PROMPT = PromptTemplate.from_template(
+    """
+    You are Ahmed, a business development executive at TechFlow Solutions - an AI & software consulting company that helps businesses leverage cutting-edge technology to solve complex problems and drive growth.
+    
+    ### JOB POSTING:
+    {job_text}
+    
+    ### RELEVANT PORTFOLIO PROJECTS:
+    {links}
+    
+    ### TASK:
+    From this one job posting, produce:
+    1. {n_subjects} compelling email subject lines (under 50 characters, specific, no spam words)
+    2. {n_variants} distinct cold email variant(s) that show you understand their needs, explain how
+       TechFlow Solutions can help, naturally mention 2-3 of the portfolio projects, and end with a
+       clear call-to-action. Keep each email professional, personable and under 200 words.
+    
+    ### OUTPUT:
+    Return only a JSON object with exactly these keys:
+    {{
+        "subject_lines": ["..."],
+        "emails": ["..."]
+    }}
+    """
+)
+
+SIGNATURE = "\n\nBest regards,\nAhmed\nBusiness Development Executive\nTechFlow Solutions\nahmed@techflowsolutions.com\n+1 (555) 123-4567"
+
+FALLBACK_SUBJECT_LINES = [
+    "Partnership Opportunity - AI & Software Solutions",
+    "Solving Your Technical Challenges",
+    "Your Next Technology Partner"
+]
+
+
+def format_links(links):
+    """Render portfolio links (dicts or plain strings) as a bullet list for the prompt"""
+    # Handle empty or None links
+    if not links:
+        return "While we don't have specific portfolio examples to share right now, we have extensive experience in similar projects."
+    
+    # Format links properly - handle both dict and string formats
+    formatted_links = []
+    for link in links:
+        if isinstance(link, dict):
+            title = link.get('title', 'Project')
+            url = link.get('link', '#')
+            description = link.get('description', 'Relevant project experience')
+            formatted_links.append(f"• [{title}]({url}): {description}")
+        else:
+            # Handle string links
+            formatted_links.append(f"• {link}")
+    
+    return "\n".join(formatted_links)
+
+
+def _parse_json_object(content):
+    """Parse the first JSON object in a completion, tolerating code fences or text around it"""
+    match = re.search(r"\{.*\}", content or "", re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object in completion")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict):
+        raise ValueError("Completion is not a JSON object")
+    return data
+
+
+def _string_list(value, limit):
+    """Non-empty stripped strings from a JSON list (or single string), at most ``limit``"""
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    items = [item.strip() for item in value if isinstance(item, str) and item.strip()]
+    return items[:limit]
+
+
+def normalize_requirements(data):
+    """Requirements dict with the expected keys and types, or None if ``data`` isn't one"""
+    if not isinstance(data, dict):
+        return None
+    return {
+        "company_name": str(data.get("company_name") or ""),
+        "job_title": str(data.get("job_title") or ""),
+        "key_requirements": _string_list(data.get("key_requirements"), 20),
+        "soft_skills": _string_list(data.get("soft_skills"), 20),
+        "company_type": str(data.get("company_type") or ""),
+        "industry": str(data.get("industry") or "")
+    }
+
+
+def parse_package(content, n_subjects=3, n_variants=1):
+    """Validate a combined-generation completion
+    
+    Returns a dict with ``requirements``, ``subject_lines`` and ``emails``; a part that is
+    missing or malformed is None so the caller can regenerate just that part.
+    """
+    try:
+        data = _parse_json_object(content)
+    except ValueError as e:
+        logging.error(f"Could not parse combined generation output: {e}")
+        return {"requirements": None, "subject_lines": None, "emails": None}
+    
+    requirements = normalize_requirements(data.get("requirements"))
+    subject_lines = _string_list(data.get("subject_lines"), n_subjects)
+    emails = [add_signature(email) for email in _string_list(data.get("emails"), n_variants)]
+    return {
+        "requirements": requirements,
+        "subject_lines": subject_lines or None,
+        "emails": emails or None
+    }
+
+
+def add_signature(email_content):
+    """Post-process the email to ensure it ends with the signature"""
+    if "Ahmed" not in email_content.split('\n')[-3:]:
+        email_content += SIGNATURE
+    return email_content
+
+
 class Chain:
-    def __init__(self):
-        """Initialize the Chain with ChatGroq LLM"""
+    def __init__(self, cache=None, use_cache=True, llm=None, scheduler=None, priority=PRIORITY_INTERACTIVE,
+                 router=None):
+        """Initialize the Chain with ChatGroq LLM (or a given chat model, e.g. for benchmarks)
+        
+        All LLM calls go through the rate-limit scheduler; ``priority`` orders this chain's calls
+        against others waiting on it (interactive before batch), unless scheduler.call_priority
+        is set for the current context. The router picks the model and output cap for each call;
+        a given chat model is used as the only model.
+        """
+        self.cache = cache if cache is not None else LLMCache(enabled=use_cache)
+        self.scheduler = scheduler if scheduler is not None else get_scheduler()
+        self.priority = priority
+        
+        if llm is not None:
+            self.llm = llm
+            self.router = router or ModelRouter(primary_model=llm.model_name, fallback_model="")
+            return
+        
+        self.router = router or ModelRouter()
+        
         try:
             api_key = os.getenv("GROQ_API_KEY")
             if not api_key:
                 raise ValueError("GROQ_API_KEY not found in environment variables")
             
+            # Imported here so callers that pass their own model never load the Groq client
+            from langchain_groq import ChatGroq
+            
             self.llm = ChatGroq(
                 temperature=0,
                 groq_api_key=api_key,
-                model_name="llama-3.1-8b-instant",
-                max_tokens=2000  # Ensure we don't hit token limits
+                model_name=self.router.primary_model,  # Model and max_tokens are set per call by the router
+                max_retries=0  # Retries and backoff are handled by the scheduler
             )
             
         except Exception as e:
             logging.error(f"Failed to initialize ChatGroq: {e}")
             raise
     
-    def extract_job_requirements(self, job_text):
-        """Extract key requirements from job posting"""
-        extract_prompt = PromptTemplate.from_template(
-            """
-            Analyze this job posting and extract the key requirements, skills, and company needs:
-            
-            {job_text}
+    def _priority(self):
+        """Scheduler priority for a call made now"""
+        priority = call_priority.get()
+        return self.priority if priority is None else priority
+    
+    def _cache_key(self, rendered_prompt, route):
+        """Cache key for a rendered prompt under the routed model and parameters"""
+        params = {
+            "temperature": self.llm.temperature,
+            "max_tokens": route.max_tokens
+        }
+        return LLMCache.make_key(route.model, params, rendered_prompt)
+    
+    def _routed_llm(self, route, json_mode=False):
+        """The LLM bound to a route's model and output cap (and Groq's JSON mode if asked)"""
+        kwargs = {"model": route.model, "max_tokens": route.max_tokens}
+        if json_mode:
+            # Completions are then a single JSON object
+            kwargs["response_format"] = {"type": "json_object"}
+        return self.llm.bind(**kwargs)
+    
+    @staticmethod
+    def _record_route(span, task, route):
+        """Note the routing decision on the span and in the route counters"""
+        span.set("model", route.model)
+        span.set("tier", route.tier)
+        span.set("max_tokens", route.max_tokens)
+        tracer.count("llm_route", task=task, model=route.model, tier=route.tier)
+    
+    @staticmethod
+    def _can_fall_back(error, routes, index):
+        if index + 1 < len(routes) and is_overloaded(error):
+            logging.warning(f"{routes[index].model} is overloaded ({type(error).__name__}), "
+                            f"falling back to {routes[index + 1].model}")
+            return True
+        return False
+    
+    def _invoke(self, prompt, inputs, task, json_mode=False, outputs=1):
+        """Run a prompt through the routed LLM and return the completion text"""
+        rendered = prompt.format(**inputs)
+        routes = self.router.routes(task, count_tokens(rendered), outputs)
+        with tracer.span(f"llm.{task}", model=routes[0].model) as span:
+            cached = self.cache.get(self._cache_key(rendered, routes[0]))
+            span.set("cache_hit", cached is not None)
+            if cached is not None:
+                return cached
             
-            Return a JSON-like structure with:
-            - company_name: Name of the hiring company
-            - job_title: Position title
-            - key_requirements: List of main technical requirements
-            - soft_skills: List of soft skills needed
-            - company_type: Type of company (startup, enterprise, etc.)
-            - industry: Industry sector
+            for index, route in enumerate(routes):
+                llm = self._routed_llm(route, json_mode)
+                try:
+                    result = self.scheduler.call(
+                        lambda: llm.invoke(rendered), estimate_tokens(rendered, route.max_tokens), self._priority(),
+                        span, stop_on=is_overloaded if index + 1 < len(routes) else None
+                    )
+                except Exception as e:
+                    if self._can_fall_back(e, routes, index):
+                        continue
+                    raise
+                self._record_route(span, task, route)
+                record_llm_usage(span, result)
+                self.cache.set(self._cache_key(rendered, routes[0]), result.content)
+                return result.content
+    
+    async def _ainvoke(self, prompt, inputs, task, json_mode=False, outputs=1):
+        """Async counterpart of _invoke using the non-blocking ChatGroq client"""
+        rendered = prompt.format(**inputs)
+        routes = self.router.routes(task, count_tokens(rendered), outputs)
+        with tracer.span(f"llm.{task}", model=routes[0].model) as span:
+            cached = self.cache.get(self._cache_key(rendered, routes[0]))
+            span.set("cache_hit", cached is not None)
+            if cached is not None:
+                return cached
             
-            Keep it concise and focused on the most important elements.
-            """
-        )
-        
-        chain = extract_prompt | self.llm
+            for index, route in enumerate(routes):
+                llm = self._routed_llm(route, json_mode)
+                try:
+                    result = await self.scheduler.acall(
+                        lambda: llm.ainvoke(rendered), estimate_tokens(rendered, route.max_tokens), self._priority(),
+                        span, stop_on=is_overloaded if index + 1 < len(routes) else None
+                    )
+                except Exception as e:
+                    if self._can_fall_back(e, routes, index):
+                        continue
+                    raise
+                self._record_route(span, task, route)
+                record_llm_usage(span, result)
+                self.cache.set(self._cache_key(rendered, routes[0]), result.content)
+                return result.content
+    
+    def extract_job_requirements(self, job_text):
+        """Extract key requirements from job posting as a dict (None if extraction fails)"""
         try:
-            result = chain.invoke({"job_text": job_text})
-            return result.content
+            content = self._invoke(EXTRACT_PROMPT, {"job_text": job_text}, "extract_job_requirements",
+                                   json_mode=True)
+            return normalize_requirements(_parse_json_object(content))
         except Exception as e:
             logging.error(f"Error extracting job requirements: {e}")
             return None
     
-    def write_mail(self, job_text, links):
-        """Generate a professional cold email based on job posting and portfolio links"""
-        
-        # Handle empty or None links
-        if not links:
-            links_text = "While we don't have specific portfolio examples to share right now, we have extensive experience in similar projects."
-        else:
-            # Format links properly - handle both dict and string formats
-            formatted_links = []
-            for link in links:
-                if isinstance(link, dict):
-                    title = link.get('title', 'Project')
-                    url = link.get('link', '#')
-                    description = link.get('description', 'Relevant project experience')
-                    formatted_links.append(f"• [{title}]({url}): {description}")
-                else:
-                    # Handle string links
-                    formatted_links.append(f"• {link}")
-            
-            links_text = "\n".join(formatted_links)
-        
-        prompt = PromptTemplate.from_template(
-            """
-            You are Ahmed, a business development executive at TechFlow Solutions - an AI & software consulting company that helps businesses leverage cutting-edge technology to solve complex problems and drive growth.
-            
-            ### JOB POSTING:
-            {job_text}
-            
-            ### RELEVANT PORTFOLIO PROJECTS:
-            {links}
-            
-            ### INSTRUCTIONS:
-            Write a professional cold email that:
-            1. Shows you understand their specific needs from the job posting
-            2. Briefly explains how TechFlow Solutions can help
-            3. Naturally mentions 2-3 relevant portfolio projects as proof of capability
-            4. Keeps the tone professional but personable
-            5. Ends with a clear, specific call-to-action
-            6. Is concise (under 200 words)
-            
-            ### WRITING GUIDELINES:
-            - Address the hiring manager professionally
-            - Don't oversell or use too much jargon
-            - Focus on value proposition and results
-            - Make it feel personalized, not templated
-            - Include your contact information
-            - Use proper email formatting
-            
-            ### EMAIL:
-            """
-        )
-        
-        chain = prompt | self.llm
+    async def aextract_job_requirements(self, job_text):
+        """Async version of extract_job_requirements"""
+        try:
+            content = await self._ainvoke(EXTRACT_PROMPT, {"job_text": job_text}, "extract_job_requirements",
+                                          json_mode=True)
+            return normalize_requirements(_parse_json_object(content))
+        except Exception as e:
+            logging.error(f"Error extracting job requirements: {e}")
+            return None
+    
+    def write_mail(self, job_text, links, raise_errors=False):
+        """Generate a professional cold email based on job posting and portfolio links
         
+        A failed call returns an error message in place of the email, or raises with
+        ``raise_errors`` (batch runs must not record that message as an email).
+        """
         try:
-            res = chain.invoke({
+            email_content = self._invoke(EMAIL_PROMPT, {
                 "job_text": job_text,
-                "links": links_text
-            })
-            
-            # Post-process the email to ensure proper formatting
-            email_content = res.content
-            
-            # Add signature if not present
-            if "Ahmed" not in email_content.split('\n')[-3:]:
-                email_content += "\n\nBest regards,\nAhmed\nBusiness Development Executive\nTechFlow Solutions\nahmed@techflowsolutions.com\n+1 (555) 123-4567"
-            
-            return email_content
+                "links": format_links(links)
+            }, "write_mail")
+            return add_signature(email_content)
             
         except Exception as e:
             logging.error(f"Error generating email: {e}")
+            if raise_errors:
+                raise
             return f"Error generating email: {str(e)}"
     
-    def refine_email(self, email_content, feedback):
-        """Refine the generated email based on user feedback"""
-        refine_prompt = PromptTemplate.from_template(
-            """
-            Here's a cold email that was generated:
+    async def awrite_mail(self, job_text, links, raise_errors=False):
+        """Async version of write_mail"""
+        try:
+            email_content = await self._ainvoke(EMAIL_PROMPT, {
+                "job_text": job_text,
+                "links": format_links(links)
+            }, "write_mail")
+            return add_signature(email_content)
             
-            {email_content}
+        except Exception as e:
+            logging.error(f"Error generating email: {e}")
+            if raise_errors:
+                raise
+            return f"Error generating email: {str(e)}"
+    
+    def stream_mail(self, job_text, links):
+        """Streaming version of write_mail: yields text chunks as the model produces them
+        
+        The signature check needs the complete email, so any signature is yielded as a
+        final chunk once the model has finished.
+        """
+        rendered = EMAIL_PROMPT.format(job_text=job_text, links=format_links(links))
+        with tracer.span("llm.stream_mail") as span:
+            parts = []
             
-            Please refine it based on this feedback:
-            {feedback}
+            try:
+                routes = self.router.routes("stream_mail", count_tokens(rendered))
+                span.set("model", routes[0].model)
+                cached = self.cache.get(self._cache_key(rendered, routes[0]))
+                span.set("cache_hit", cached is not None)
+                if cached is not None:
+                    parts.append(cached)
+                    yield cached
+                else:
+                    message = None
+                    index = 0
+                    attempt = 0
+                    waited = 0.0
+                    while True:
+                        route = routes[index]
+                        reserved = estimate_tokens(rendered, route.max_tokens)
+                        waited += self.scheduler.acquire(reserved, self._priority())
+                        try:
+                            for chunk in self._routed_llm(route).stream(rendered):
+                                # Summing chunks also merges the usage metadata sent with the last one
+                                message = chunk if message is None else message + chunk
+                                if chunk.content:
+                                    parts.append(chunk.content)
+                                    yield chunk.content
+                            break
+                        except Exception as e:
+                            # Text already shown can't be taken back, so only retry or fall back before the first chunk
+                            if parts:
+                                self.scheduler.record_failure(span, waited, attempt)
+                                raise
+                            if self._can_fall_back(e, routes, index):
+                                # The fallback model gets its own retry budget
+                                self.scheduler.record_failure(span, waited, attempt)
+                                index += 1
+                                attempt = 0
+                                continue
+                            delay = self.scheduler.retry_delay(e, attempt)
+                            if delay is None:
+                                self.scheduler.record_failure(span, waited, attempt)
+                                raise
+                            logging.warning(f"Email stream failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                            time.sleep(delay)
+                            attempt += 1
+                    span.set("queue_ms", round(waited * 1000, 3))
+                    span.set("retries", attempt)
+                    self.scheduler.settle(reserved, message)
+                    self._record_route(span, "stream_mail", route)
+                    record_llm_usage(span, message)
+                    self.cache.set(self._cache_key(rendered, routes[0]), "".join(parts))
+                
+                email_content = "".join(parts)
+                signed = add_signature(email_content)
+                if len(signed) > len(email_content):
+                    yield signed[len(email_content):]
             
-            Return the improved version while maintaining the professional tone and structure.
-            """
-        )
-        
-        chain = refine_prompt | self.llm
-        
+            except Exception as e:
+                logging.error(f"Error generating email: {e}")
+                span.error = f"{type(e).__name__}: {e}"
+                yield f"Error generating email: {str(e)}"
+    
+    def refine_email(self, email_content, feedback):
+        """Refine the generated email based on user feedback"""
+        try:
+            return self._invoke(REFINE_PROMPT, {
+                "email_content": email_content,
+                "feedback": feedback
+            }, "refine_email")
+        except Exception as e:
+            logging.error(f"Error refining email: {e}")
+            return email_content  # Return original if refinement fails
+    
+    async def arefine_email(self, email_content, feedback):
+        """Async version of refine_email"""
         try:
-            res = chain.invoke({
+            return await self._ainvoke(REFINE_PROMPT, {
                 "email_content": email_content,
                 "feedback": feedback
-            })
-            return res.content
+            }, "refine_email")
         except Exception as e:
             logging.error(f"Error refining email: {e}")
             return email_content  # Return original if refinement fails
     
     def generate_subject_line(self, job_text):
         """Generate compelling subject lines for the email"""
-        subject_prompt = PromptTemplate.from_template(
-            """
-            Based on this job posting, generate 3 compelling email subject lines that would make a hiring manager want to open the email:
-            
-            {job_text}
-            
-            Guidelines:
-            - Keep them under 50 characters
-            - Make them specific and relevant
-            - Avoid spam words
-            - Show value proposition
-            
-            Return only the 3 subject lines, one per line.
-            """
+        try:
+            return self._invoke(SUBJECT_PROMPT, {"job_text": job_text}, "generate_subject_line").strip().split('\n')
+        except Exception as e:
+            logging.error(f"Error generating subject lines: {e}")
+            return list(FALLBACK_SUBJECT_LINES)
+    
+    async def agenerate_subject_line(self, job_text):
+        """Async version of generate_subject_line"""
+        try:
+            content = await self._ainvoke(SUBJECT_PROMPT, {"job_text": job_text}, "generate_subject_line")
+            return content.strip().split('\n')
+        except Exception as e:
+            logging.error(f"Error generating subject lines: {e}")
+            return list(FALLBACK_SUBJECT_LINES)
+    
+    async def agenerate_outreach(self, job_text, links):
+        """Generate the email, subject lines and job requirements for one posting concurrently
+        
+        The three LLM calls are independent, so they are fired at the same time and the
+        total wall-clock time is that of the slowest one. Each call keeps its own fallback,
+        so one failure does not discard the other results.
+        """
+        email, subject_lines, requirements = await asyncio.gather(
+            self.awrite_mail(job_text, links),
+            self.agenerate_subject_line(job_text),
+            self.aextract_job_requirements(job_text)
         )
+        return {
+            "email": email,
+            "subject_lines": subject_lines,
+            "requirements": requirements
+        }
+    
+    def _package_inputs(self, job_text, links, n_subjects, n_variants):
+        return {
+            "job_text": job_text,
+            "links": format_links(links),
+            "n_subjects": n_subjects,
+            "n_variants": n_variants
+        }
+    
+    @staticmethod
+    def _package_result(package, mode):
+        return {
+            "email": package["emails"][0],
+            "email_variants": package["emails"],
+            "subject_lines": package["subject_lines"],
+            "requirements": package["requirements"],
+            "package_mode": mode
+        }
+    
+    @staticmethod
+    def _package_prompt(requirements):
+        return PACKAGE_PROMPT if requirements is None else PACKAGE_NO_REQUIREMENTS_PROMPT
+    
+    def generate_package(self, job_text, links, n_subjects=3, n_variants=1, raise_errors=False, requirements=None):
+        """Generate requirements, subject lines and email variant(s) with a single prompt
         
-        chain = subject_prompt | self.llm
+        The job posting is sent once instead of three times. Requirements already extracted
+        can be passed in, and are then not asked for again. Any part the model leaves
+        missing or malformed is regenerated with its dedicated prompt; ``raise_errors``
+        applies to the email fallback as in write_mail.
+        """
+        try:
+            content = self._invoke(self._package_prompt(requirements),
+                                   self._package_inputs(job_text, links, n_subjects, n_variants),
+                                   "generate_package", json_mode=True, outputs=n_variants)
+            package = parse_package(content, n_subjects, n_variants)
+        except Exception as e:
+            logging.error(f"Error generating combined package: {e}")
+            package = {"requirements": None, "subject_lines": None, "emails": None}
+        if requirements is not None:
+            package["requirements"] = requirements
         
+        mode = "combined"
+        if package["emails"] is None:
+            package["emails"] = [self.write_mail(job_text, links, raise_errors)]
+            mode = "fallback"
+        if package["subject_lines"] is None:
+            package["subject_lines"] = self.generate_subject_line(job_text)[:n_subjects]
+            mode = "fallback"
+        if package["requirements"] is None:
+            package["requirements"] = self.extract_job_requirements(job_text)
+            mode = "fallback"
+        return self._package_result(package, mode)
+    
+    async def agenerate_package(self, job_text, links, n_subjects=3, n_variants=1, raise_errors=False,
+                                requirements=None):
+        """Async version of generate_package; missing parts are regenerated concurrently"""
         try:
-            res = chain.invoke({"job_text": job_text})
-            return res.content.strip().split('\n')
+            content = await self._ainvoke(self._package_prompt(requirements),
+                                          self._package_inputs(job_text, links, n_subjects, n_variants),
+                                          "generate_package", json_mode=True, outputs=n_variants)
+            package = parse_package(content, n_subjects, n_variants)
         except Exception as e:
-            logging.error(f"Error generating subject lines: {e}")
-            return [
-                "Partnership Opportunity - AI & Software Solutions",
-                "Solving Your Technical Challenges",
-                "Your Next Technology Partner"
-            ]
+            logging.error(f"Error generating combined package: {e}")
+            package = {"requirements": None, "subject_lines": None, "emails": None}
+        if requirements is not None:
+            package["requirements"] = requirements
+        
+        fallbacks = {}
+        if package["emails"] is None:
+            fallbacks["emails"] = self.awrite_mail(job_text, links, raise_errors)
+        if package["subject_lines"] is None:
+            fallbacks["subject_lines"] = self.agenerate_subject_line(job_text)
+        if package["requirements"] is None:
+            fallbacks["requirements"] = self.aextract_job_requirements(job_text)
+        
+        if fallbacks:
+            results = await asyncio.gather(*fallbacks.values())
+            for part, value in zip(fallbacks, results):
+                package[part] = value
+            if "emails" in fallbacks:
+                package["emails"] = [package["emails"]]
+            if "subject_lines" in fallbacks:
+                package["subject_lines"] = package["subject_lines"][:n_subjects]
+        return self._package_result(package, "fallback" if fallbacks else "combined")
     
     def test_connection(self):
         """Test if the LLM connection is working"""
         try:
             test_prompt = PromptTemplate.from_template("Say 'Connection successful' if you can read this.")
-            chain = test_prompt | self.llm
-            result = chain.invoke({})
-            return "Connection successful" in result.content
+            return "Connection successful" in self._invoke(test_prompt, {}, "test_connection")
         except Exception as e:
             logging.error(f"Connection test failed: {e}")
             return False
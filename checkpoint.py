@@ -0,0 +1,164 @@
+import csv
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+# Columns written by export_results; lists and dicts are stored as JSON strings
+EXPORT_COLUMNS = [
+    "url", "status", "error", "email", "subject_lines", "email_variants", "skills", "links", "requirements",
+    "package_mode", "duplicate_of", "similarity", "tokens_before", "tokens_after", "elapsed_s", "trace_id"
+]
+
+
+class BatchCheckpoint:
+    def __init__(self, path: str, params: Optional[Dict[str, Any]] = None):
+        """Durable per-posting stage outputs for resumable batch runs
+
+        The fetched text and the analysis (skills, requirements, portfolio links) are
+        saved as soon as each stage finishes, and the finished record with the email and
+        subject lines once the posting is done. A rerun skips postings that completed and
+        resumes the others from their last saved stage. ``params`` describes the run
+        configuration; reusing a checkpoint with different params raises ValueError, since
+        saved stages would not match.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS stages (
+                url TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                value BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (url, stage)
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                record TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+        if params is not None:
+            stored = self._conn.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+            encoded = json.dumps(params, sort_keys=True)
+            if stored is None:
+                with self._lock:
+                    self._conn.execute("INSERT INTO meta VALUES ('params', ?)", (encoded,))
+                    self._conn.commit()
+            elif stored[0] != encoded:
+                raise ValueError(f"Checkpoint {path} was written with different settings: {stored[0]}")
+
+    def close(self):
+        self._conn.close()
+
+    def get_stage(self, url: str, stage: str) -> Optional[Any]:
+        """Saved output of a stage for a URL, or None if that stage hasn't finished"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM stages WHERE url = ? AND stage = ?", (url, stage)).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def save_stage(self, url: str, stage: str, value: Any):
+        """Persist a stage output (compressed JSON, since fetched pages can be large)"""
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?)", (url, stage, blob, time.time()))
+            self._conn.commit()
+
+    def completed(self, url: str) -> Optional[Dict[str, Any]]:
+        """Finished record for a URL that succeeded in an earlier run, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM results WHERE url = ? AND status = 'ok'", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_result(self, record: Dict[str, Any]):
+        """Persist a finished record; failed ones are retried on the next run
+
+        Only a record with a generated email counts as completed, so a posting whose
+        generation gave up (e.g. out of rate-limit retries) is never skipped on resume.
+        """
+        status = "ok" if record["status"] == "ok" and record.get("email") else "error"
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                               (record["url"], status, json.dumps(record, ensure_ascii=False), time.time()))
+            self._conn.commit()
+
+    def iter_results(self, chunk_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """Finished records in chunks, read with a cursor so the whole run is never in memory"""
+        # A separate connection keeps the cursor independent of concurrent writes on the shared one
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute("SELECT record FROM results ORDER BY url")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield [json.loads(row[0]) for row in rows]
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM results GROUP BY status"))
+            postings = self._conn.execute("SELECT COUNT(DISTINCT url) FROM stages").fetchone()[0]
+        return {"ok": counts.get("ok", 0), "error": counts.get("error", 0), "postings_with_stages": postings}
+
+
+def _export_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    row = {}
+    for column in EXPORT_COLUMNS:
+        value = record.get(column)
+        row[column] = json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+    return row
+
+
+def _parquet_schema():
+    import pyarrow as pa
+    numeric = {"similarity": pa.float64(), "tokens_before": pa.int64(), "tokens_after": pa.int64(),
+               "elapsed_s": pa.float64()}
+    return pa.schema([(column, numeric.get(column, pa.string())) for column in EXPORT_COLUMNS])
+
+
+def export_results(checkpoint: BatchCheckpoint, path: str, chunk_size: int = 500) -> int:
+    """Write all finished records to CSV or Parquet (by extension), one chunk at a time
+
+    Parquet output gets one row group per chunk and needs pyarrow. Returns the number
+    of rows written.
+    """
+    written = 0
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from e
+
+        schema = _parquet_schema()
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in checkpoint.iter_results(chunk_size):
+                writer.write_table(pa.Table.from_pylist([_export_row(record) for record in chunk], schema=schema))
+                written += len(chunk)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS)
+            writer.writeheader()
+            for chunk in checkpoint.iter_results(chunk_size):
+                writer.writerows(_export_row(record) for record in chunk)
+                written += len(chunk)
+
+    logging.info(f"Exported {written} results to {path}")
+    return written
+
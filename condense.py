@@ -0,0 +1,207 @@
+import logging
+import re
+from typing import Any, Dict, List
+
+DEFAULT_TOKEN_BUDGET = 1500
+
+# Llama 3's tokenizer is a superset of cl100k_base, so counts are close to what Groq bills
+TOKENIZER_ENCODING = "cl100k_base"
+
+# Lines that are site chrome rather than part of the posting; whole words only, so "design in"
+# or "backlog in" in a requirement doesn't read as "sign in" / "log in"
+BOILERPLATE_PATTERN = re.compile(
+    r"\b(cookies?|accept all|reject all|privacy (policy|notice|settings)|terms (of use|and conditions)|"
+    r"all rights reserved|skip to (main )?content|sign in|log in|create (an )?account|"
+    r"follow us|share (this )?(job|on)|back to (jobs|search|results)|powered by|"
+    r"equal opportunity employer|subscribe|newsletter)\b|©",
+    re.IGNORECASE
+)
+
+# Headings after which the rest of the page is listings of other jobs
+TRAILING_SECTION_PATTERN = re.compile(
+    r"^(similar|related|recommended|other|more) (jobs|roles|positions|openings)|^people also (viewed|applied)|"
+    r"^jobs you may like",
+    re.IGNORECASE
+)
+
+# Section headings that carry the requirements the email should respond to
+RELEVANT_HEADING_PATTERN = re.compile(
+    r"requirement|qualification|responsibilit|skills|experience|what you('ll| will) (do|bring|need)|"
+    r"who you are|about (the|this) (role|position|job)|the role|you have|must have|nice to have|"
+    r"preferred|tech stack|our stack|duties",
+    re.IGNORECASE
+)
+
+# Headings of the other common sections, recognised even right after a run of bullets
+OTHER_HEADING_PATTERN = re.compile(
+    r"benefit|perks|what we offer|compensation|salary|about (us|the company|the team)|who we are|"
+    r"our (culture|values|mission|team)|why (join|work)|how to apply|location",
+    re.IGNORECASE
+)
+
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    """Load the tokenizer once; None if tiktoken or its encoding file is unavailable"""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception as e:
+            logging.warning(f"Tokenizer unavailable, estimating token counts from length: {e}")
+            _encoder = None
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text"""
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens"""
+    encoder = _get_encoder()
+    if encoder is not None:
+        tokens = encoder.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoder.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def _is_short(line: str) -> bool:
+    return len(line) <= 60 and len(line.split()) <= 8 and not line.endswith(".")
+
+
+def _heading_kind(line: str, previous: str) -> str:
+    """"named" for a line that names a section, "short" for another short line after a longer one, else ""
+
+    Short lines inside a run of short lines are bullets of the section above, unless
+    they end with a colon or name a known section.
+    """
+    if not _is_short(line):
+        return ""
+    if line.endswith(":") or len(line.split()) <= 4 and (
+            RELEVANT_HEADING_PATTERN.search(line) or OTHER_HEADING_PATTERN.search(line)):
+        return "named"
+    return "short" if not _is_short(previous) else ""
+
+
+def _clean_lines(text: str) -> List[str]:
+    """Normalise whitespace, drop boilerplate and repeated lines, stop at trailing job lists"""
+    lines = []
+    seen = set()
+    for raw_line in text.splitlines():
+        line = " ".join(raw_line.split())
+        if not line:
+            continue
+        if TRAILING_SECTION_PATTERN.search(line):
+            break
+        # Word count first: it is far cheaper than the regex and rules out long paragraphs
+        if len(line.split()) < 25 and BOILERPLATE_PATTERN.search(line):
+            continue
+        key = line.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+
+    # Navigation menus show up as runs of one- or two-word lines; drop runs of 4+, except under a
+    # relevant heading, where they are short bullets such as a list of required technologies
+    cleaned = []
+    run = []
+    relevant = False
+    previous = ""
+    for line in lines:
+        if _heading_kind(line, previous) == "named":
+            relevant = bool(RELEVANT_HEADING_PATTERN.search(line))
+        previous = line
+        if len(line.split()) <= 2 and not relevant and not RELEVANT_HEADING_PATTERN.search(line):
+            run.append(line)
+            continue
+        if len(run) < 4:
+            cleaned.extend(run)
+        run = []
+        cleaned.append(line)
+    if len(run) < 4:
+        cleaned.extend(run)
+    return cleaned
+
+
+def _split_sections(lines: List[str]) -> List[Dict[str, Any]]:
+    """Group lines into sections, each starting at a heading
+
+    Sections started by an unnamed short line are marked ``inherits``: they may be a
+    sub-list of the section before, so they take over its relevance.
+    """
+    sections = []
+    current = {"heading": "", "lines": [], "inherits": False}
+    previous = ""
+    for line in lines:
+        kind = _heading_kind(line, previous)
+        if kind and current["lines"]:
+            sections.append(current)
+            current = {"heading": line, "lines": [line], "inherits": kind == "short"}
+        else:
+            if not current["lines"]:
+                current["heading"] = line
+            current["lines"].append(line)
+        previous = line
+    if current["lines"]:
+        sections.append(current)
+    return sections
+
+
+def condense_job_text(text: str, token_budget: int = DEFAULT_TOKEN_BUDGET) -> Dict[str, Any]:
+    """Strip boilerplate from fetched job text and fit it into a token budget
+
+    The opening section (usually title and company) is always kept, then sections whose
+    heading looks like requirements/responsibilities, then the rest in page order.
+    Returns the condensed text together with token counts before and after.
+    """
+    tokens_before = count_tokens(text)
+    sections = _split_sections(_clean_lines(text))
+
+    relevant = False
+    for index, section in enumerate(sections):
+        section["index"] = index
+        section["text"] = "\n".join(section["lines"])
+        section["tokens"] = count_tokens(section["text"])
+        relevant = bool(RELEVANT_HEADING_PATTERN.search(section["heading"])) or section["inherits"] and relevant
+        if index == 0:
+            section["priority"] = 0
+        elif relevant:
+            section["priority"] = 1
+        else:
+            section["priority"] = 2
+
+    selected = []
+    remaining = token_budget
+    for section in sorted(sections, key=lambda s: (s["priority"], s["index"])):
+        if remaining <= 0:
+            break
+        if section["tokens"] <= remaining:
+            selected.append((section["index"], section["text"]))
+            remaining -= section["tokens"] + 1
+        elif section["priority"] < 2:
+            # Keep as much of an important section as still fits
+            selected.append((section["index"], truncate_to_tokens(section["text"], remaining)))
+            remaining = 0
+
+    condensed = "\n".join(text for _, text in sorted(selected))
+    condensed = truncate_to_tokens(condensed, token_budget)
+    tokens_after = count_tokens(condensed)
+
+    logging.info(f"Condensed job text from {tokens_before} to {tokens_after} tokens")
+    return {
+        "text": condensed,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after
+    }
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+DEFAULT_EMBEDDING_CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding_cache")
+
+
+def embedding_model_id(embedding_function) -> str:
+    """Identifier of the model behind an embedding function (name plus config where available)"""
+    try:
+        name = embedding_function.name()
+        config = embedding_function.get_config()
+        if name is not NotImplemented and config is not NotImplemented:
+            return f"{name}:{json.dumps(config, sort_keys=True, default=str)}"
+    except Exception:
+        pass
+    return f"{type(embedding_function).__module__}.{type(embedding_function).__qualname__}"
+
+
+class EmbeddingCache:
+    def __init__(self, model_id: str, directory=DEFAULT_EMBEDDING_CACHE_DIRECTORY, max_memory_entries=10000,
+                 enabled=True):
+        """Two-tier cache of text embeddings for one model: an in-memory LRU over an on-disk store
+
+        On disk, vectors are appended as float32 rows to a flat file that is read through
+        a memory map, and a small SQLite index maps each text hash to its row. Entries are
+        keyed on a hash of the text under a per-model directory, so changing the model
+        never serves stale vectors. Set EMBEDDING_CACHE_DISABLED=1 (or pass enabled=False)
+        to always call the model.
+        """
+        self.model_id = model_id
+        self.max_memory_entries = max_memory_entries
+        self.enabled = enabled and os.getenv("EMBEDDING_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._dim = None
+        self._mmap = None
+        self.directory = os.path.join(directory, hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:16])
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+
+        if not self.enabled:
+            return
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('model_id', ?)", (model_id,))
+            self._conn.commit()
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+            self._dim = int(row[0]) if row else None
+        except Exception as e:
+            logging.error(f"Failed to open embedding cache at {self.directory}, using memory only: {e}")
+            self._conn = None
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _rows(self) -> np.ndarray:
+        """Memory map over the vector file, reopened when other writers have grown it"""
+        rows = os.path.getsize(self._vectors_path) // (self._dim * 4) if os.path.exists(self._vectors_path) else 0
+        if self._mmap is None or self._mmap.shape[0] < rows:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim)) \
+                if rows else np.zeros((0, self._dim), dtype=np.float32)
+        return self._mmap
+
+    def _read_disk(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if self._conn is None or self._dim is None or not keys:
+            return {}
+        found = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self._conn.execute(f"SELECT key, row FROM vectors WHERE key IN ({placeholders})", batch))
+        if not found:
+            return {}
+        rows = self._rows()
+        return {key: np.array(rows[row]) for key, row in found.items() if row < rows.shape[0]}
+
+    def _write_disk(self, vectors: Dict[str, np.ndarray]):
+        if self._conn is None or not vectors:
+            return
+        dim = len(next(iter(vectors.values())))
+        # BEGIN IMMEDIATE takes SQLite's write lock, so concurrent processes append to distinct rows
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+            if row is None:
+                self._conn.execute("INSERT INTO meta VALUES ('dim', ?)", (str(dim),))
+            elif int(row[0]) != dim:
+                raise ValueError(f"embedding size {dim} does not match cached size {row[0]}")
+            self._dim = dim
+
+            next_row = self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+            keys = list(vectors)
+            matrix = np.ascontiguousarray([vectors[key] for key in keys], dtype=np.float32)
+            # Rows past MAX(row) are leftovers of an interrupted write and are overwritten
+            with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "wb") as f:
+                f.seek(next_row * dim * 4)
+                f.write(matrix.tobytes())
+            self._conn.executemany("INSERT OR IGNORE INTO vectors VALUES (?, ?)",
+                                   [(key, next_row + i) for i, key in enumerate(keys)])
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+
+    def embed(self, texts: Sequence[str], embedding_function: Callable[[List[str]], Any]) -> np.ndarray:
+        """float32 embeddings for texts, calling embedding_function only for texts not cached"""
+        if not texts:
+            return np.zeros((0, self._dim or 0), dtype=np.float32)
+        if not self.enabled:
+            self.misses += len(texts)
+            return np.ascontiguousarray(embedding_function(list(texts)), dtype=np.float32)
+
+        keys = [self.make_key(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory and key not in vectors:
+                    self._memory.move_to_end(key)
+                    vectors[key] = self._memory[key]
+                    self.memory_hits += 1
+
+            try:
+                from_disk = self._read_disk([key for key in dict.fromkeys(keys) if key not in vectors])
+            except Exception as e:
+                logging.error(f"Embedding cache lookup failed: {e}")
+                from_disk = {}
+            for key, vector in from_disk.items():
+                vectors[key] = vector
+                self._remember(key, vector)
+            self.disk_hits += len(from_disk)
+
+        # The model runs outside the lock, once for all missing texts (duplicates embedded once)
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            computed = np.ascontiguousarray(embedding_function(list(missing.values())), dtype=np.float32)
+            new = dict(zip(missing, computed))
+            with self._lock:
+                self.misses += len(missing)
+                for key, vector in new.items():
+                    self._remember(key, vector)
+                try:
+                    self._write_disk(new)
+                except Exception as e:
+                    logging.error(f"Embedding cache write failed: {e}")
+            vectors.update(new)
+
+        return np.stack([vectors[key] for key in keys])
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per tier and current sizes"""
+        disk_entries = 0
+        if self._conn is not None:
+            with self._lock:
+                disk_entries = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "model_id": self.model_id,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk_entries
+        }
@@ -0,0 +1,296 @@
+import json
+import re
+from html import unescape
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, List, Optional, Union
+from urllib.parse import urlparse
+
+# Characters of HTML parsed per page (postings sit near the top, so anything past this is padding and
+# listings). This bounds parsing CPU only: the fetcher has already downloaded up to its max_bytes
+DEFAULT_MAX_CHARS = 1_000_000
+FEED_CHUNK_SIZE = 64 * 1024
+
+# Job description containers of common applicant tracking systems: (source, attribute, value, match, wrapper)
+# where match is "class" for one class among several, or "exact" for the whole attribute value. A rule
+# with a wrapper id only applies after an element with that id, or on the ATS's own host (ATS_HOSTS)
+ATS_CONTAINERS = [
+    ("workday", "data-automation-id", "jobPostingDescription", "exact", None),
+    ("greenhouse", "class", "job__description", "class", None),
+    # Plenty of other sites have a div#content wrapper or an <a id="content"> skip link
+    ("greenhouse", "id", "content", "exact", "app_body"),
+    ("lever", "class", "posting-page", "class", None),
+    ("generic", "itemprop", "description", "exact", None),
+]
+ATS_HOSTS = {"greenhouse": "greenhouse.io", "lever": "lever.co", "workday": "myworkdayjobs.com"}
+
+# Container text shorter than this (e.g. filled in by JavaScript) is not trusted as the description
+MIN_CONTAINER_CHARS = 200
+
+# Elements holding the job title / company name on those pages
+ATS_TITLE_FIELDS = [
+    ("data-automation-id", "jobPostingHeader", "class"),
+    ("class", "app-title", "class"),
+    ("class", "job__title", "class"),
+]
+ATS_COMPANY_FIELDS = [
+    ("class", "company-name", "class"),
+    ("data-automation-id", "company", "exact"),
+]
+
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "select", "button"}
+BLOCK_TAGS = {"p", "div", "br", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "table", "section",
+              "article", "header", "footer", "main", "aside", "nav", "dd", "dt", "blockquote", "pre", "hr"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+_WRAPPER_IDS = {rule[4] for rule in ATS_CONTAINERS if rule[4]}
+_SPACES = re.compile(r"[ \t\r\f\v ]+")
+
+
+def _matches(attrs: Dict[str, str], attribute: str, value: str, match: str) -> bool:
+    actual = attrs.get(attribute)
+    if actual is None:
+        return False
+    return value in actual.split() if match == "class" else actual == value
+
+
+class JobPageExtractor(HTMLParser):
+    def __init__(self, max_chars=DEFAULT_MAX_CHARS, url: Optional[str] = None):
+        """Incremental HTML-to-text extractor for job posting pages
+
+        Feed HTML in chunks; parsing stops once a known job description container with
+        substantial text has closed or ``max_chars`` characters have been fed. A container
+        that closes nearly empty is dropped and parsing goes on. Script, style and similar
+        elements are skipped without building a document tree. JSON-LD JobPosting data,
+        ATS title/company elements and meta tags supply the title and company. The page
+        ``url``, if given, enables the ATS rules that need the ATS's own host.
+        """
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        host = urlparse(url).netloc.lower() if url else ""
+        self._ats_hosts = {source for source, domain in ATS_HOSTS.items()
+                           if host == domain or host.endswith("." + domain)}
+        self._wrappers_seen = set()
+        self.fed = 0
+        self.done = False
+        self.truncated = False
+        self.source = None
+
+        self._page = []
+        self._container = None
+        self._container_tag = None
+        self._container_depth = 0
+        self._skip_depth = 0
+        self._skip_tag = None
+        self._json_ld = None
+        self._json_ld_blocks = []
+        self._field = None
+        self._field_tag = None
+        self._field_depth = 0
+        self._field_text = []
+        self._fields = {}
+        self._in_title = False
+        self._page_title = []
+        self._meta = {}
+
+    def feed(self, data: str):
+        if self.done:
+            return
+        room = self.max_chars - self.fed
+        if len(data) > room:
+            data = data[:room]
+            self.truncated = True
+        self.fed += len(data)
+        super().feed(data)
+        if self.fed >= self.max_chars:
+            self.truncated = True
+            self.done = True
+
+    def _emit(self, text: str):
+        self._page.append(text)
+        if self._container is not None:
+            self._container.append(text)
+        if self._field is not None:
+            self._field_text.append(text)
+
+    def _start_field(self, name: str, tag: str):
+        if self._field is None and name not in self._fields:
+            self._field, self._field_tag, self._field_depth = name, tag, 1
+            self._field_text = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+
+        attributes = {name: value or "" for name, value in attrs}
+        if tag == "script" and attributes.get("type", "").lower() == "application/ld+json":
+            self._json_ld = []
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag == "meta":
+            key = attributes.get("property") or attributes.get("name")
+            if key:
+                self._meta.setdefault(key.lower(), attributes.get("content", ""))
+            return
+        if tag in SKIPPED_TAGS:
+            self._skip_tag, self._skip_depth = tag, 1
+            return
+
+        if attributes.get("id") in _WRAPPER_IDS:
+            self._wrappers_seen.add(attributes["id"])
+        if self._container is None:
+            for source, attribute, value, match, wrapper in ATS_CONTAINERS:
+                if wrapper is not None and wrapper not in self._wrappers_seen and source not in self._ats_hosts:
+                    continue
+                if _matches(attributes, attribute, value, match):
+                    self.source = source
+                    self._container, self._container_tag, self._container_depth = [], tag, 0
+                    break
+        # Only the container's own tag name is counted, so unclosed <p> or <li> can't throw it off
+        if self._container is not None and tag == self._container_tag:
+            self._container_depth += 1
+        if self._field is not None and tag == self._field_tag:
+            self._field_depth += 1
+
+        for attribute, value, match in ATS_TITLE_FIELDS:
+            if _matches(attributes, attribute, value, match):
+                self._start_field("title", tag)
+        for attribute, value, match in ATS_COMPANY_FIELDS:
+            if _matches(attributes, attribute, value, match):
+                self._start_field("company", tag)
+
+        if tag in BLOCK_TAGS:
+            self._emit("\n")
+        if tag in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+                    if self._json_ld is not None:
+                        self._json_ld_blocks.append("".join(self._json_ld))
+                        self._json_ld = None
+            return
+        if tag == "title":
+            self._in_title = False
+            return
+
+        if tag in BLOCK_TAGS:
+            self._emit("\n")
+        if self._field is not None and tag == self._field_tag:
+            self._field_depth -= 1
+            if self._field_depth == 0:
+                self._fields[self._field] = " ".join("".join(self._field_text).split())
+                self._field = None
+        if self._container is not None and tag == self._container_tag:
+            self._container_depth -= 1
+            if self._container_depth == 0:
+                if len("".join(self._container).strip()) >= MIN_CONTAINER_CHARS:
+                    # The description is complete; the rest of the page is navigation and listings
+                    self.done = True
+                else:
+                    # Nearly empty: not the description after all, so keep looking
+                    self._container, self._container_tag, self.source = None, None, None
+
+    def handle_data(self, data):
+        if self.done:
+            return
+        if self._skip_tag is not None:
+            if self._json_ld is not None:
+                self._json_ld.append(data)
+            return
+        if self._in_title:
+            self._page_title.append(data)
+            return
+        self._emit(data)
+
+    def _job_posting(self) -> Dict[str, Any]:
+        """First JSON-LD object of type JobPosting, if any"""
+        for block in self._json_ld_blocks:
+            try:
+                data = json.loads(block)
+            except ValueError:
+                continue
+            if isinstance(data, dict):
+                data = data.get("@graph", [data])
+            candidates = data if isinstance(data, list) else []
+            for candidate in candidates:
+                if isinstance(candidate, dict) and candidate.get("@type") == "JobPosting":
+                    return candidate
+        return {}
+
+    @staticmethod
+    def _clean(parts: List[str]) -> str:
+        lines = (_SPACES.sub(" ", line).strip() for line in "".join(parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+    def result(self) -> Dict[str, Any]:
+        """Extracted text, title, company and which container the text came from"""
+        if not self.done:
+            self.close()
+        posting = self._job_posting()
+        organization = posting.get("hiringOrganization")
+        page_title = " ".join("".join(self._page_title).split())
+
+        title = posting.get("title") or self._fields.get("title")
+        company = (organization.get("name") if isinstance(organization, dict) else organization) or \
+            re.sub(r"^at\s+", "", self._fields.get("company", "")) or self._meta.get("og:site_name")
+        heading = self._meta.get("og:title") or page_title
+        if heading and (not title or not company):
+            # Greenhouse: "Job Application for <title> at <company>"; Lever: "<company> - <title>"
+            match = re.match(r"(?:job application for )?(.+?) at (.+)$", heading, re.IGNORECASE)
+            if match:
+                title, company = title or match.group(1), company or match.group(2)
+            elif self.source == "lever" and " - " in heading:
+                lever_company, lever_title = heading.split(" - ", 1)
+                title, company = title or lever_title, company or lever_company
+            else:
+                title = title or heading
+
+        text = self._clean(self._container) if self._container is not None else ""
+        source = self.source
+        # Also covers a container still open when parsing stopped at max_chars
+        if len(text) < MIN_CONTAINER_CHARS:
+            text = self._clean(self._page)
+            source = "page"
+        return {
+            "text": text,
+            "title": unescape(title) if title else None,
+            "company": unescape(company) if company else None,
+            "source": source,
+            "truncated": self.truncated,
+            "chars_parsed": self.fed
+        }
+
+
+def extract_job_page(html: Union[str, Iterable[str]], max_chars: int = DEFAULT_MAX_CHARS,
+                     url: Optional[str] = None) -> Dict[str, Any]:
+    """Extract text, title and company from a job page given as a string or an iterable of chunks"""
+    extractor = JobPageExtractor(max_chars=max_chars, url=url)
+    chunks = (html[i:i + FEED_CHUNK_SIZE] for i in range(0, len(html), FEED_CHUNK_SIZE)) \
+        if isinstance(html, str) else html
+    for chunk in chunks:
+        extractor.feed(chunk)
+        if extractor.done:
+            break
+    return extractor.result()
+
+
+def page_text(page: Dict[str, Any]) -> str:
+    """Posting text with the title and company on top when they are not already in it"""
+    header = [value for value in (page["title"], page["company"]) if value and value not in page["text"][:500]]
+    return "\n".join(header + [page["text"]]) if header else page["text"]
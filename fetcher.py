@@ -0,0 +1,227 @@
+import codecs
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+
+from extractor import DEFAULT_MAX_CHARS, extract_job_page, page_text
+
+DEFAULT_PAGE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "page_cache.sqlite3")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; ColdEmailGenerator/1.0)",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9"
+}
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">, near the top of the page
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+
+
+def is_valid_url(url):
+    """Validate if the URL is properly formatted"""
+    try:
+        result = urlparse(url)
+        return all([result.scheme, result.netloc])
+    except Exception:
+        return False
+
+
+class PageCache:
+    def __init__(self, path=DEFAULT_PAGE_CACHE_PATH, max_entries=2000, ttl_seconds=7 * 24 * 3600):
+        """SQLite store of fetched pages keyed by URL, with their validators
+
+        Pages not fetched or revalidated for ttl_seconds are dropped, then the least
+        recently fetched ones above max_entries (bodies can be several MB each).
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_fetched ON pages (fetched_at)")
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached page for url, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"body": row[0], "etag": row[1], "last_modified": row[2], "fetched_at": row[3]}
+
+    def put(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str]):
+        """Store or replace a fetched page and evict expired / least recently fetched pages"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, body, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (now - self.ttl_seconds,))
+
+        if self.max_entries:
+            self._conn.execute(
+                """
+                DELETE FROM pages WHERE url IN (
+                    SELECT url FROM pages ORDER BY fetched_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def touch(self, url: str):
+        """Mark a cached page as freshly validated"""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+
+class Fetcher:
+    def __init__(self, cache=None, max_age=900, connect_timeout=5.0, read_timeout=20.0,
+                 max_bytes=5 * 1024 * 1024, per_host_limit=4, pool_size=32, headers=None,
+                 max_extract_chars=DEFAULT_MAX_CHARS):
+        """HTTP fetcher for job postings with a pooled session, page cache and per-host limits
+
+        Pages younger than max_age seconds are served from the cache without a request;
+        older ones are revalidated with If-None-Match / If-Modified-Since. Bodies larger
+        than max_bytes are truncated; text extraction then parses at most max_extract_chars of
+        the decoded body, which bounds parsing work but not the download.
+        """
+        self.cache = cache if cache is not None else PageCache()
+        self.max_age = max_age
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_bytes = max_bytes
+        self.per_host_limit = per_host_limit
+        self.max_extract_chars = max_extract_chars
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+
+    def _slot_for(self, url: str) -> threading.BoundedSemaphore:
+        """Semaphore limiting concurrent requests to the URL's host"""
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def _read_body(self, response: requests.Response) -> str:
+        """Read the response body, stopping at max_bytes"""
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                logging.warning(f"Response from {response.url} exceeds {self.max_bytes} bytes, truncating")
+                break
+        body = b"".join(chunks)[:self.max_bytes]
+        return body.decode(self._encoding(response, body), errors="replace")
+
+    @staticmethod
+    def _encoding(response: requests.Response, body: bytes) -> str:
+        """Charset from the Content-Type header, else the page's <meta> tag, else detected from the bytes
+
+        Without a charset in the header requests reports ISO-8859-1 for text/html, which
+        garbles the UTF-8 most pages are served in.
+        """
+        if "charset" in response.headers.get("Content-Type", "").lower() and response.encoding:
+            return response.encoding
+        match = _META_CHARSET.search(body[:4096])
+        if match:
+            encoding = match.group(1).decode("ascii")
+            try:
+                codecs.lookup(encoding)
+                return encoding
+            except LookupError:
+                pass
+        try:
+            # Incremental, so a multi-byte character cut off at max_bytes doesn't count against UTF-8
+            codecs.getincrementaldecoder("utf-8")().decode(body)
+            return "utf-8"
+        except UnicodeDecodeError:
+            pass
+        return chardet.detect(body).get("encoding") or "utf-8"
+
+    def fetch(self, url: str) -> Dict[str, Any]:
+        """Fetch a page, using the cache and conditional requests where possible
+
+        Returns a dict with the HTML body and whether it came from the cache.
+        """
+        cached = self.cache.get(url)
+        if cached and time.time() - cached["fetched_at"] < self.max_age:
+            return {"url": url, "html": cached["body"], "from_cache": True, "revalidated": False}
+
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        with self._slot_for(url):
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    self.cache.touch(url)
+                    return {"url": url, "html": cached["body"], "from_cache": True, "revalidated": True}
+
+                response.raise_for_status()
+                body = self._read_body(response)
+
+        self.cache.put(url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return {"url": url, "html": body, "from_cache": False, "revalidated": False}
+
+    def load_page(self, url: str) -> Dict[str, Any]:
+        """Fetch a page and extract the posting text, title and company"""
+        return extract_job_page(self.fetch(url)["html"], self.max_extract_chars, url)
+
+    def load_text(self, url: str) -> str:
+        """Fetch a page and return the posting text, headed by its title and company"""
+        return page_text(self.load_page(url))
+
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_fetcher() -> Fetcher:
+    """Process-wide shared Fetcher so connections and the page cache are reused"""
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher()
+        return _default_fetcher
@@ -0,0 +1,65 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, keeping forms like "c++", "c#" and "node.js" intact"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        """Inverted index with Okapi BM25 scoring and heap-based top-k retrieval"""
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.doc_lengths: List[int] = []
+        self.avg_doc_length = 0.0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def build(self, documents: List[str]):
+        """Index documents; a document's id is its position in the list"""
+        postings = defaultdict(list)
+        self.doc_lengths = []
+
+        for doc_id, text in enumerate(documents):
+            terms = tokenize(text)
+            self.doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                postings[term].append((doc_id, tf))
+
+        n_docs = len(documents)
+        self.postings = dict(postings)
+        self.avg_doc_length = sum(self.doc_lengths) / n_docs if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[float, int]]:
+        """Return up to k (score, doc_id) pairs with a positive score, best first"""
+        if not self.doc_lengths or k <= 0:
+            return []
+
+        scores = defaultdict(float)
+        avg_length = self.avg_doc_length or 1.0
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in docs:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        # Ties go to the earlier document so results are stable
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(score, doc_id) for doc_id, score in best]
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3")
+
+
+class LLMCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=5000, ttl_seconds=7 * 24 * 3600, enabled=True):
+        """Persistent SQLite cache of LLM completions with TTL and LRU eviction
+
+        Entries are keyed on a hash of the model name, generation parameters and the
+        fully rendered prompt, so any change to one of them is a different entry.
+        Set LLM_CACHE_DISABLED=1 (or pass enabled=False) to bypass the cache.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and os.getenv("LLM_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if not self.enabled:
+            return
+
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS completions (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_accessed ON completions (accessed_at)")
+            self._conn.commit()
+        except Exception as e:
+            logging.error(f"Failed to open LLM cache at {path}, caching disabled: {e}")
+            self.enabled = False
+            self._conn = None
+
+    @staticmethod
+    def make_key(model: str, params: Dict[str, Any], prompt: str) -> str:
+        """Content-addressed key for a (model, params, rendered prompt) triple"""
+        payload = json.dumps({"model": model, "params": params, "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached completion for key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM completions WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                    self.misses += 1
+                    return None
+
+                self._conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return row[0]
+        except Exception as e:
+            logging.error(f"LLM cache lookup failed: {e}")
+            return None
+
+    def set(self, key: str, value: str):
+        """Store a completion and evict expired / least recently used entries"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._evict(now)
+                self._conn.commit()
+        except Exception as e:
+            logging.error(f"LLM cache write failed: {e}")
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used ones above max_entries"""
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        if self.max_entries:
+            self._conn.execute(
+                """
+                DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        """Remove all cached completions and reset the counters"""
+        self.hits = 0
+        self.misses = 0
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        entries = 0
+        if self.enabled:
+            with self._lock:
+                entries = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries
+        }
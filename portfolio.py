@@ -1,23 +1,49 @@
-import pandas as pd
-import uuid
+import argparse
+import csv
+import itertools
+import numpy as np
+import hashlib
 import logging
 import os
-from typing import List, Dict, Any
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Iterator
 
-# Fix SQLite issue for Streamlit Cloud
-try:
-    import pysqlite3
-    import sys
-    sys.modules['sqlite3'] = pysqlite3
-except ImportError:
-    pass
+from embedding_cache import DEFAULT_EMBEDDING_CACHE_DIRECTORY, EmbeddingCache, embedding_model_id
+from lexical_index import BM25Index
+
+DEFAULT_PERSIST_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vectorstore")
+
+# Rows read from the CSV per ingest step, and rows embedded per collection.add call
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_ADD_BATCH_SIZE = 256
+
+# Distinct (skill set, n_results) queries whose links are kept per portfolio version
+DEFAULT_QUERY_CACHE_SIZE = 4096
+
+
+def _import_chromadb():
+    """Import ChromaDB on first use; it is by far the slowest import in the app"""
+    # Fix SQLite issue for Streamlit Cloud
+    try:
+        import pysqlite3
+        sys.modules['sqlite3'] = pysqlite3
+    except ImportError:
+        pass
+    
+    import chromadb
+    from chromadb.config import Settings
+    from chromadb.utils import embedding_functions
+    return chromadb, Settings, embedding_functions
 
-import chromadb
-from chromadb.config import Settings
 
 class Portfolio:
-    def __init__(self, file_path=None):
-        """Initialize Portfolio with ChromaDB"""
+    def __init__(self, file_path=None, persist_directory=DEFAULT_PERSIST_DIRECTORY, embedding_function=None,
+                 embedding_cache_directory=DEFAULT_EMBEDDING_CACHE_DIRECTORY, query_cache_size=DEFAULT_QUERY_CACHE_SIZE):
+        """Initialize Portfolio with ChromaDB (pass embedding_cache_directory=None to skip the embedding cache)"""
         # Handle file path
         if file_path is None:
             possible_paths = [
@@ -36,22 +62,48 @@ class Portfolio:
         else:
             self.file_path = file_path
         
-        # Load portfolio data
-        self.data = self._load_portfolio_data()
+        # Rows are streamed from the CSV when needed, so large catalogs are never held in memory
+        self._data = None
+        self._version = None
+        
+        # Normalised portfolio embeddings for batch matching, built on first use
+        self._embedding_matrix = None
+        self._matrix_metadatas = []
+        
+        # Links per canonical query, keyed on the portfolio version so a sync never serves stale results
+        self.query_cache_size = query_cache_size
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+        self._query_cache = OrderedDict()
+        self._query_cache_lock = threading.Lock()
         
         # Initialize ChromaDB with proper settings
         try:
-            self.chroma_client = chromadb.Client(
-                Settings(
-                    chroma_api_impl="chromadb.api.ephemeral.EphemeralAPI",
+            chromadb, Settings, embedding_functions = _import_chromadb()
+            
+            # Persist embeddings so unchanged portfolio rows are not re-embedded on restart
+            self.chroma_client = chromadb.PersistentClient(
+                path=persist_directory,
+                settings=Settings(
                     anonymized_telemetry=False,
                     allow_reset=True
                 )
             )
             
+            # Kept on the instance so batch queries can embed without going through Chroma
+            self.embedding_function = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+            
+            # Documents and queries are embedded through the cache and handed to Chroma as vectors
+            self.embedding_cache = EmbeddingCache(
+                embedding_model_id(self.embedding_function),
+                directory=embedding_cache_directory or DEFAULT_EMBEDDING_CACHE_DIRECTORY,
+                enabled=embedding_cache_directory is not None
+            )
+            
             self.collection = self.chroma_client.get_or_create_collection(
                 name="portfolio",
-                metadata={"description": "Portfolio projects and skills"}
+                metadata={"description": "Portfolio projects and skills"},
+                embedding_function=self.embedding_function
             )
             
             logging.info("ChromaDB initialized successfully")
@@ -62,20 +114,42 @@ class Portfolio:
             self.use_fallback = True
             self.fallback_data = []
     
-    def _load_portfolio_data(self) -> pd.DataFrame:
-        """Load portfolio data from CSV or create default data"""
+    def _iter_rows(self) -> Iterator[Dict[str, str]]:
+        """Stream portfolio rows from the CSV, or the default rows if there is no readable CSV"""
         if self.file_path and os.path.exists(self.file_path):
             try:
-                data = pd.read_csv(self.file_path)
-                logging.info(f"Portfolio data loaded from {self.file_path}")
-                return data
+                f = open(self.file_path, newline="", encoding="utf-8-sig")
             except Exception as e:
                 logging.error(f"Error loading portfolio CSV: {e}")
-                return self._create_default_portfolio()
-        else:
-            return self._create_default_portfolio()
+            else:
+                with f:
+                    yield from csv.DictReader(f)
+                return
+        yield from self._create_default_portfolio()
+    
+    @property
+    def data(self) -> List[Dict[str, str]]:
+        """All portfolio rows, read on first access (only the in-memory fallback needs them)"""
+        if self._data is None:
+            self._data = list(self._iter_rows())
+        return self._data
+    
+    @property
+    def version(self) -> str:
+        """Hash of the portfolio rows; changes whenever a row is added, removed or edited"""
+        if self._version is None:
+            total = 0
+            for row in self._iter_rows():
+                total = self._add_to_version(total, self._row_id(*self._row_to_document(row)))
+            self._version = f"{total:016x}"
+        return self._version
     
-    def _create_default_portfolio(self) -> pd.DataFrame:
+    @staticmethod
+    def _add_to_version(total, row_id):
+        # Summing row hashes makes the version independent of row order and computable in one pass
+        return (total + int(row_id[:16], 16)) % (1 << 64)
+    
+    def _create_default_portfolio(self) -> List[Dict[str, str]]:
         """Create a default portfolio with sample data"""
         default_data = {
             'Techstack': [
@@ -121,56 +195,64 @@ class Portfolio:
         }
         
         logging.info("Created default portfolio data")
-        return pd.DataFrame(default_data)
+        return [dict(zip(default_data, values)) for values in zip(*default_data.values())]
+    
+    @staticmethod
+    def _row_to_document(row):
+        """Build the embedded document text and metadata for one portfolio row"""
+        tech_stack = str(row.get("Techstack", ""))
+        title = str(row.get("Title", ""))
+        description = str(row.get("Description", ""))
+        
+        document = f"{title} {tech_stack} {description}".strip()
+        
+        metadata = {
+            "link": str(row.get("Links", "")),
+            "title": title,
+            "description": description,
+            "techstack": tech_stack
+        }
+        return document, metadata
     
-    def load_portfolio(self):
-        """Load the portfolio data into the vector database"""
+    @staticmethod
+    def _row_id(document, metadata):
+        """Stable id derived from a hash of the row's content"""
+        content = "\x1f".join([document, metadata["link"], metadata["title"],
+                                metadata["description"], metadata["techstack"]])
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    
+    def _load_fallback(self):
+        """Load the portfolio into in-memory storage with a BM25 index for lexical queries"""
+        self.fallback_data = []
+        for row in self.data:
+            self.fallback_data.append({
+                'title': str(row.get("Title", "")),
+                'techstack': str(row.get("Techstack", "")),
+                'link': str(row.get("Links", "")),
+                'description': str(row.get("Description", ""))
+            })
+        
+        self.fallback_index = BM25Index()
+        self.fallback_index.build([
+            f"{project['title']} {project['techstack']} {project['description']}"
+            for project in self.fallback_data
+        ])
+        logging.info(f"Loaded {len(self.fallback_data)} items using fallback storage")
+    
+    def load_portfolio(self, chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_ADD_BATCH_SIZE, progress=None):
+        """Load the portfolio data into the vector database
+        
+        The CSV is streamed in chunks of ``chunk_size`` rows and new rows are embedded
+        ``batch_size`` at a time, so memory stays flat however large the catalog is.
+        ``progress(rows_read, rows_added)`` is called after each chunk.
+        """
         try:
             if hasattr(self, 'use_fallback') and self.use_fallback:
                 # Use fallback storage
-                self.fallback_data = []
-                for _, row in self.data.iterrows():
-                    self.fallback_data.append({
-                        'title': str(row.get("Title", "")),
-                        'techstack': str(row.get("Techstack", "")),
-                        'link': str(row.get("Links", "")),
-                        'description': str(row.get("Description", ""))
-                    })
-                logging.info(f"Loaded {len(self.fallback_data)} items using fallback storage")
+                self._load_fallback()
                 return
             
-            if not self.collection.count():
-                documents = []
-                metadatas = []
-                ids = []
-                
-                for _, row in self.data.iterrows():
-                    tech_stack = str(row.get("Techstack", ""))
-                    title = str(row.get("Title", ""))
-                    description = str(row.get("Description", ""))
-                    
-                    document = f"{title} {tech_stack} {description}".strip()
-                    
-                    metadata = {
-                        "link": str(row.get("Links", "")),
-                        "title": title,
-                        "description": description,
-                        "techstack": tech_stack
-                    }
-                    
-                    documents.append(document)
-                    metadatas.append(metadata)
-                    ids.append(str(uuid.uuid4()))
-                
-                self.collection.add(
-                    documents=documents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-                
-                logging.info(f"Loaded {len(documents)} portfolio items into ChromaDB")
-            else:
-                logging.info("Portfolio already loaded in ChromaDB")
+            self._sync_collection(chunk_size, batch_size, progress)
                 
         except Exception as e:
             logging.error(f"Error loading portfolio: {e}")
@@ -178,62 +260,268 @@ class Portfolio:
             self.use_fallback = True
             self.load_portfolio()
     
+    @staticmethod
+    def _chunks(rows: Iterable[Dict[str, str]], size: int) -> Iterator[List[Dict[str, str]]]:
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, size))
+            if not chunk:
+                return
+            yield chunk
+    
+    def _sync_collection(self, chunk_size, batch_size, progress):
+        """Stream the CSV into Chroma, then delete stored rows that are no longer in it
+        
+        Ids are content hashes, so rows already stored are skipped and an interrupted
+        ingest resumes where it stopped when run again. Ids seen so far are kept in a
+        temporary SQLite file rather than in memory.
+        """
+        batch_size = max(1, min(batch_size, self.chroma_client.get_max_batch_size()))
+        rows_read = added = removed = 0
+        version = 0
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            seen = sqlite3.connect(os.path.join(tmp, "seen.sqlite3"))
+            seen.execute("CREATE TABLE seen (id TEXT PRIMARY KEY)")
+            seen.execute("CREATE TABLE stale (id TEXT PRIMARY KEY)")
+            
+            for chunk in self._chunks(self._iter_rows(), chunk_size):
+                wanted = {}
+                for row in chunk:
+                    document, metadata = self._row_to_document(row)
+                    row_id = self._row_id(document, metadata)
+                    version = self._add_to_version(version, row_id)
+                    wanted[row_id] = (document, metadata)
+                seen.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(row_id,) for row_id in wanted])
+                
+                existing = set(self.collection.get(ids=list(wanted), include=[])["ids"])
+                to_add = [row_id for row_id in wanted if row_id not in existing]
+                for start in range(0, len(to_add), batch_size):
+                    batch = to_add[start:start + batch_size]
+                    documents = [wanted[row_id][0] for row_id in batch]
+                    self.collection.add(
+                        documents=documents,
+                        embeddings=self._embed(documents),
+                        metadatas=[wanted[row_id][1] for row_id in batch],
+                        ids=batch
+                    )
+                
+                rows_read += len(chunk)
+                added += len(to_add)
+                if progress:
+                    progress(rows_read, added)
+                if to_add:
+                    logging.info(f"Portfolio ingest: {rows_read} rows read, {added} added")
+            
+            # Page through the stored ids and collect those that weren't in the CSV
+            offset = 0
+            while True:
+                page = self.collection.get(include=[], limit=batch_size, offset=offset)["ids"]
+                if not page:
+                    break
+                offset += len(page)
+                placeholders = ",".join("?" * len(page))
+                known = {row[0] for row in seen.execute(f"SELECT id FROM seen WHERE id IN ({placeholders})", page)}
+                seen.executemany("INSERT OR IGNORE INTO stale VALUES (?)",
+                                 [(row_id,) for row_id in page if row_id not in known])
+            
+            stale = seen.execute("SELECT id FROM stale")
+            while True:
+                batch = [row[0] for row in stale.fetchmany(batch_size)]
+                if not batch:
+                    break
+                self.collection.delete(ids=batch)
+                removed += len(batch)
+            seen.close()
+        
+        if self._version != f"{version:016x}":
+            self.clear_query_cache()
+        self._version = f"{version:016x}"
+        if added or removed:
+            self._embedding_matrix = None
+            logging.info(f"Portfolio synced to ChromaDB: {added} added, {removed} removed, "
+                         f"{rows_read - added} unchanged")
+        else:
+            logging.info("Portfolio already up to date in ChromaDB")
+    
+    @staticmethod
+    def canonical_skills(skills: List[str]) -> tuple:
+        """Lowercased, de-duplicated and sorted skills, so equivalent queries share a cache entry"""
+        return tuple(sorted({skill.strip().lower() for skill in skills if skill and skill.strip()}))
+    
     def query_links(self, skills: List[str], n_results: int = 3) -> List[Dict[str, Any]]:
-        """Query the most relevant portfolio links"""
+        """Query the most relevant portfolio links
+        
+        Results are cached per canonical skill set and n_results under the current
+        portfolio version, so a repeated query is a dictionary lookup until the next sync.
+        """
+        skills = self.canonical_skills(skills)
         if not skills:
             return []
         
+        key = (self.version, bool(getattr(self, 'use_fallback', False)), skills, n_results)
+        with self._query_cache_lock:
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                self._query_cache.move_to_end(key)
+                self.query_cache_hits += 1
+                return [dict(link) for link in cached]
+            self.query_cache_misses += 1
+        
         try:
             # Use fallback if ChromaDB failed
             if hasattr(self, 'use_fallback') and self.use_fallback:
-                return self._fallback_query(skills, n_results)
-            
-            query_text = " ".join(skills)
+                portfolio_links = self._fallback_query(list(skills), n_results)
+            else:
+                portfolio_links = self._query_collection(" ".join(skills), n_results)
+        
+        except Exception as e:
+            # Not cached, so the vector store is tried again on the next query
+            logging.error(f"Error querying portfolio links: {e}")
+            return self._fallback_query(list(skills), n_results)
+        
+        with self._query_cache_lock:
+            self._query_cache[key] = tuple(dict(link) for link in portfolio_links)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return portfolio_links
+    
+    def _query_collection(self, query_text: str, n_results: int) -> List[Dict[str, Any]]:
+        results = self.collection.query(
+            query_embeddings=self._embed([query_text]),
+            n_results=min(n_results, self.collection.count())
+        )
+        
+        portfolio_links = []
+        metadatas = results.get('metadatas', [[]])
+        
+        if metadatas and metadatas[0]:
+            for metadata in metadatas[0]:
+                portfolio_links.append(self._metadata_to_link(metadata))
+        
+        logging.info(f"Found {len(portfolio_links)} relevant portfolio projects")
+        return portfolio_links
+    
+    def clear_query_cache(self):
+        """Drop all cached query results"""
+        with self._query_cache_lock:
+            self._query_cache.clear()
+    
+    def query_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size of the query result cache"""
+        lookups = self.query_cache_hits + self.query_cache_misses
+        return {
+            "hits": self.query_cache_hits,
+            "misses": self.query_cache_misses,
+            "hit_rate": self.query_cache_hits / lookups if lookups else 0.0,
+            "entries": len(self._query_cache),
+            "version": self._version
+        }
+    
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embeddings for texts, running the model only for texts not in the embedding cache"""
+        return self.embedding_cache.embed(texts, self.embedding_function)
+    
+    @staticmethod
+    def _metadata_to_link(metadata) -> Dict[str, Any]:
+        """Convert stored collection metadata into a portfolio link dict"""
+        return {
+            'title': metadata.get('title', 'Project'),
+            'link': metadata.get('link', ''),
+            'description': metadata.get('description', ''),
+            'techstack': metadata.get('techstack', '')
+        }
+    
+    @staticmethod
+    def _normalize_rows(vectors) -> np.ndarray:
+        """Contiguous float32 matrix with unit-length rows, so a dot product is cosine similarity"""
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+    
+    def _get_embedding_matrix(self):
+        """Load all portfolio embeddings from Chroma into one matrix (cached until the next sync)"""
+        if self._embedding_matrix is None:
+            stored = self.collection.get(include=["embeddings", "metadatas"])
+            embeddings = stored.get("embeddings")
+            if embeddings is None or len(embeddings) == 0:
+                self._embedding_matrix = np.zeros((0, 0), dtype=np.float32)
+                self._matrix_metadatas = []
+            else:
+                self._embedding_matrix = self._normalize_rows(embeddings)
+                self._matrix_metadatas = stored["metadatas"]
+        return self._embedding_matrix, self._matrix_metadatas
+    
+    def query_links_batch(self, skills_lists: List[List[str]], n_results: int = 3,
+                          block_size: int = 1024) -> List[List[Dict[str, Any]]]:
+        """Query portfolio links for many skill lists at once
+        
+        All queries are embedded in one call and scored against the cached portfolio
+        matrix with a matrix multiply per block of queries, then the top n_results are
+        picked with argpartition. Returns one list of links per input skill list. Skill
+        lists are canonicalised as in query_links, so both return the same links.
+        """
+        results = [[] for _ in skills_lists]
+        skills_lists = [self.canonical_skills(skills) for skills in skills_lists]
+        positions = [i for i, skills in enumerate(skills_lists) if skills]
+        if not positions:
+            return results
+        
+        try:
+            if hasattr(self, 'use_fallback') and self.use_fallback:
+                raise RuntimeError("ChromaDB unavailable")
             
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=min(n_results, self.collection.count())
-            )
+            matrix, metadatas = self._get_embedding_matrix()
+            if not metadatas:
+                return results
+            k = min(n_results, len(metadatas))
             
-            portfolio_links = []
-            metadatas = results.get('metadatas', [[]])
+            query_texts = [" ".join(skills_lists[i]) for i in positions]
+            queries = self._normalize_rows(self._embed(query_texts))
             
-            if metadatas and metadatas[0]:
-                for metadata in metadatas[0]:
-                    portfolio_links.append({
-                        'title': metadata.get('title', 'Project'),
-                        'link': metadata.get('link', ''),
-                        'description': metadata.get('description', ''),
-                        'techstack': metadata.get('techstack', '')
-                    })
+            # Score in blocks so the (queries x portfolio) score matrix stays bounded
+            for start in range(0, len(positions), block_size):
+                scores = queries[start:start + block_size] @ matrix.T
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(scores, top, axis=1)
+                top = np.take_along_axis(top, np.argsort(-top_scores, axis=1, kind="stable"), axis=1)
+                
+                for row, doc_ids in enumerate(top):
+                    results[positions[start + row]] = [self._metadata_to_link(metadatas[j]) for j in doc_ids]
             
-            logging.info(f"Found {len(portfolio_links)} relevant portfolio projects")
-            return portfolio_links
+            logging.info(f"Matched {len(positions)} skill lists against {len(metadatas)} portfolio projects")
+            return results
             
         except Exception as e:
-            logging.error(f"Error querying portfolio links: {e}")
-            return self._fallback_query(skills, n_results)
+            logging.error(f"Batch portfolio query failed, using fallback: {e}")
+            for i in positions:
+                results[i] = self._fallback_query(list(skills_lists[i]), n_results)
+            return results
     
     def _fallback_query(self, skills: List[str], n_results: int = 3) -> List[Dict[str, Any]]:
-        """Fallback query method using simple string matching"""
-        if not hasattr(self, 'fallback_data'):
-            self.load_portfolio()
+        """Fallback query method using BM25 over the in-memory portfolio"""
+        if not hasattr(self, 'fallback_index'):
+            self._load_fallback()
         
-        scored_projects = []
-        skills_lower = [skill.lower() for skill in skills]
-        
-        for project in self.fallback_data:
-            score = 0
-            project_text = f"{project['title']} {project['techstack']} {project['description']}".lower()
-            
-            for skill in skills_lower:
-                if skill in project_text:
-                    score += 1
-            
-            if score > 0:
-                scored_projects.append((score, project))
-        
-        # Sort by score and return top results
-        scored_projects.sort(key=lambda x: x[0], reverse=True)
-        return [project for _, project in scored_projects[:n_results]]
-       
+        results = self.fallback_index.search(" ".join(skills), n_results)
+        return [self.fallback_data[doc_id] for _, doc_id in results]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a portfolio CSV into the vector store")
+    parser.add_argument("csv", nargs="?", help="Portfolio CSV (default: portfolio.csv lookup as in the app)")
+    parser.add_argument("--persist-directory", default=DEFAULT_PERSIST_DIRECTORY)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows read per step")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_ADD_BATCH_SIZE, help="Rows embedded per add")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+    
+    portfolio = Portfolio(args.csv, persist_directory=args.persist_directory)
+    portfolio.load_portfolio(chunk_size=args.chunk_size, batch_size=args.batch_size)
+    return 1 if getattr(portfolio, "use_fallback", False) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import logging
+import os
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_PRIMARY_MODEL = "llama-3.1-8b-instant"
+# Separate capacity and rate limits on Groq, so it can take over while the primary is overloaded
+DEFAULT_FALLBACK_MODEL = "llama-3.3-70b-versatile"
+
+# Context windows in tokens; models not listed are assumed to have DEFAULT_CONTEXT_WINDOW
+MODEL_CONTEXT_WINDOWS = {
+    "llama-3.1-8b-instant": 131072,
+    "llama-3.3-70b-versatile": 131072,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Output caps per task: (base tokens, tokens per output beyond the first, tokens per 1k prompt tokens, ceiling).
+# Emails are asked to stay under 200 words (~270 tokens); subject lines under 50 characters each.
+TASK_OUTPUT_LIMITS = {
+    "extract_job_requirements": (200, 0, 60, 500),
+    "generate_subject_line": (60, 0, 0, 60),
+    "write_mail": (400, 0, 0, 400),
+    "stream_mail": (400, 0, 0, 400),
+    "refine_email": (500, 0, 0, 500),
+    "generate_package": (650, 350, 40, 2000),
+}
+# What every call used before routing, kept for tasks without their own limits
+DEFAULT_OUTPUT_TOKENS = 2000
+
+# A model is skipped if the prompt leaves it less room than this to answer
+MIN_OUTPUT_TOKENS = 64
+
+Route = namedtuple("Route", ["model", "max_tokens", "tier"])
+
+
+class ModelRouter:
+    def __init__(self, primary_model=None, fallback_model=None, task_models: Optional[Dict[str, str]] = None,
+                 task_limits: Optional[Dict[str, Tuple[int, int, int, int]]] = None,
+                 context_windows: Optional[Dict[str, int]] = None):
+        """Pick the model and output cap for each LLM call, with a fallback model for overload
+
+        The primary model comes from GROQ_MODEL (or ``task_models`` for a given task) and
+        the fallback from GROQ_FALLBACK_MODEL; set the latter to an empty string to disable
+        it. Output caps follow TASK_OUTPUT_LIMITS, growing with the number of requested
+        outputs and the prompt size, and never exceed what is left of the model's context.
+        """
+        self.primary_model = primary_model or os.getenv("GROQ_MODEL", DEFAULT_PRIMARY_MODEL)
+        self.fallback_model = fallback_model if fallback_model is not None else \
+            os.getenv("GROQ_FALLBACK_MODEL", DEFAULT_FALLBACK_MODEL)
+        self.task_models = dict(task_models or {})
+        self.task_limits = dict(TASK_OUTPUT_LIMITS, **(task_limits or {}))
+        self.context_windows = dict(MODEL_CONTEXT_WINDOWS, **(context_windows or {}))
+
+    def output_tokens(self, task: str, prompt_tokens: int, outputs: int = 1) -> int:
+        """Output cap for a task given the prompt size and the number of outputs asked for"""
+        if task not in self.task_limits:
+            return DEFAULT_OUTPUT_TOKENS
+        base, per_output, per_1k_input, ceiling = self.task_limits[task]
+        return min(ceiling, base + per_output * max(outputs - 1, 0) + per_1k_input * prompt_tokens // 1000)
+
+    def routes(self, task: str, prompt_tokens: int, outputs: int = 1) -> List[Route]:
+        """Models to try in order (primary, then fallback), each with its output cap
+
+        A model whose context can't hold the prompt plus a useful answer is skipped, so
+        oversized inputs go straight to a larger-context model when one is configured.
+        """
+        cap = self.output_tokens(task, prompt_tokens, outputs)
+        candidates = [(self.task_models.get(task, self.primary_model), "primary"), (self.fallback_model, "fallback")]
+        routes = []
+        for model, tier in candidates:
+            if not model or any(route.model == model for route in routes):
+                continue
+            room = self.context_windows.get(model, DEFAULT_CONTEXT_WINDOW) - prompt_tokens
+            if room < MIN_OUTPUT_TOKENS:
+                logging.warning(f"Prompt of {prompt_tokens} tokens is too large for {model}, skipping it for {task}")
+                continue
+            routes.append(Route(model, min(cap, room), tier))
+        if not routes:
+            raise ValueError(f"Prompt of {prompt_tokens} tokens does not fit any configured model")
+        return routes
@@ -0,0 +1,305 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from condense import count_tokens
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITY_NAMES = {"interactive": PRIORITY_INTERACTIVE, "batch": PRIORITY_BATCH}
+
+# Priority for the LLM calls made in the current context (e.g. one service job), overriding the Chain's own
+call_priority = contextvars.ContextVar("call_priority", default=None)
+
+# Groq's published limits for llama-3.1-8b-instant on the free tier; override with GROQ_RPM / GROQ_TPM
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_TOKENS_PER_MINUTE = 6000
+
+# Completion tokens assumed when reserving TPM capacity; corrected once the real usage is known
+DEFAULT_COMPLETION_ESTIMATE = 400
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Groq answers 503 when a model is over capacity and 498 when the flex tier is full
+OVERLOADED_STATUS_CODES = {498, 503}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+                         "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError"}
+
+# How often waiters that are not at the head of the queue re-check it
+_POLL_INTERVAL = 0.05
+
+
+class TokenBucket:
+    def __init__(self, capacity, refill_per_second):
+        """Continuously refilling bucket; callers hold the scheduler lock"""
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount, now) -> float:
+        """Seconds until ``amount`` is available (0 if it is available now)"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.refill_per_second)
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """Give back (negative) or charge (positive) tokens after the fact"""
+        self.level = min(self.capacity, self.level - amount)
+
+
+def estimate_tokens(prompt_text: str, completion_tokens: int = DEFAULT_COMPLETION_ESTIMATE) -> int:
+    """Tokens a request is expected to count against TPM: the prompt plus an expected completion"""
+    return count_tokens(prompt_text) + completion_tokens
+
+
+def _total_tokens(message: Any) -> Optional[int]:
+    """Total tokens reported on a LangChain AI message, if any"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    return token_usage.get("total_tokens")
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a retry-after header on the error's HTTP response, if present"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, timeouts, connection drops and 5xx responses are worth retrying"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def is_overloaded(error: Exception) -> bool:
+    """The model itself is out of capacity, so another model may do better than a retry"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in OVERLOADED_STATUS_CODES:
+        return True
+    message = str(error).lower()
+    return "over capacity" in message or "overloaded" in message
+
+
+class RateLimitScheduler:
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_retries=6, base_delay=1.0,
+                 max_delay=60.0):
+        """Admit LLM calls under RPM/TPM token buckets, highest priority first, retrying throttled calls
+
+        Buckets and the priority queue are per process: the app, batch.py and the service
+        each assume the full budget. Submit batch work to the service so it shares one
+        scheduler with interactive requests.
+        """
+        requests_per_minute = requests_per_minute or int(os.getenv("GROQ_RPM", DEFAULT_REQUESTS_PER_MINUTE))
+        tokens_per_minute = tokens_per_minute or int(os.getenv("GROQ_TPM", DEFAULT_TOKENS_PER_MINUTE))
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Condition()
+        self._queue = []
+        self._counter = itertools.count()
+        self._paused_until = 0.0
+        self._stats = {"admitted": 0, "retries": 0, "throttled": 0, "failed": 0, "wait_seconds": 0.0}
+
+    def _enqueue(self, tokens, priority):
+        entry = (priority, next(self._counter), tokens)
+        with self._lock:
+            heapq.heappush(self._queue, entry)
+        return entry
+
+    def _try_admit(self, entry) -> float:
+        """Admit the entry if it is first in line and capacity allows; otherwise seconds to wait"""
+        with self._lock:
+            if self._queue[0] is not entry:
+                return _POLL_INTERVAL
+            now = time.monotonic()
+            tokens = entry[2]
+            wait = max(self._paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            heapq.heappop(self._queue)
+            self._stats["admitted"] += 1
+            self._lock.notify_all()
+            return 0.0
+
+    def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Block until one request of ``tokens`` tokens may be sent; returns the seconds waited"""
+        started = time.monotonic()
+        entry = self._enqueue(tokens, priority)
+        while True:
+            wait = self._try_admit(entry)
+            if wait == 0:
+                break
+            with self._lock:
+                self._lock.wait(wait)
+        return self._record_wait(started)
+
+    async def aacquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Async version of acquire that sleeps on the event loop instead of blocking it"""
+        started = time.monotonic()
+        entry = self._enqueue(tokens, priority)
+        try:
+            while True:
+                wait = self._try_admit(entry)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            self._discard(entry)
+            raise
+        return self._record_wait(started)
+
+    def _discard(self, entry):
+        """Drop a cancelled waiter so it doesn't block the queue"""
+        with self._lock:
+            if entry in self._queue:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._lock.notify_all()
+
+    def _record_wait(self, started) -> float:
+        waited = time.monotonic() - started
+        with self._lock:
+            self._stats["wait_seconds"] += waited
+        return waited
+
+    def settle(self, reserved: int, message: Any):
+        """Correct the TPM bucket with the usage the API actually reported"""
+        actual = _total_tokens(message)
+        if actual is None:
+            return
+        with self._lock:
+            self.tokens.adjust(actual - reserved)
+            self._lock.notify_all()
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying after ``error``, or None if the call should fail"""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+
+        # Full jitter keeps concurrent callers from retrying in lockstep
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, self.base_delay))
+
+        with self._lock:
+            self._stats["retries"] += 1
+            if getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError":
+                # The server is throttling everyone, so hold back all queued calls, not just this one
+                self._stats["throttled"] += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def call(self, fn: Callable[[], Any], tokens: int, priority: int = PRIORITY_INTERACTIVE, span=None,
+             stop_on: Optional[Callable[[Exception], bool]] = None) -> Any:
+        """Run ``fn`` once admitted, retrying retryable failures with backoff
+
+        Errors for which ``stop_on`` returns True are raised at once, e.g. so the caller
+        can switch to a fallback model instead of waiting out retries.
+        """
+        waited = 0.0
+        for attempt in itertools.count():
+            waited += self.acquire(tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = None if stop_on is not None and stop_on(e) else self.retry_delay(e, attempt)
+                if delay is None:
+                    self.record_failure(span, waited, attempt)
+                    raise
+                logging.warning(f"LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+                continue
+            self.settle(tokens, result)
+            self._annotate(span, waited, attempt)
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], tokens: int, priority: int = PRIORITY_INTERACTIVE,
+                    span=None, stop_on: Optional[Callable[[Exception], bool]] = None) -> Any:
+        """Async version of call; ``fn`` returns a fresh awaitable on every attempt"""
+        waited = 0.0
+        for attempt in itertools.count():
+            waited += await self.aacquire(tokens, priority)
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = None if stop_on is not None and stop_on(e) else self.retry_delay(e, attempt)
+                if delay is None:
+                    self.record_failure(span, waited, attempt)
+                    raise
+                logging.warning(f"LLM call failed ({type(e).__name__}), retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+            self.settle(tokens, result)
+            self._annotate(span, waited, attempt)
+            return result
+
+    def record_failure(self, span=None, waited: float = 0.0, attempt: int = 0):
+        """Count a call that gave up (for callers that retry outside call/acall)"""
+        with self._lock:
+            self._stats["failed"] += 1
+        self._annotate(span, waited, attempt)
+
+    @staticmethod
+    def _annotate(span, waited, attempt):
+        if span is not None:
+            span.set("queue_ms", round(waited * 1000, 3))
+            span.set("retries", attempt)
+
+    def stats(self) -> dict:
+        """Admission, retry and throttling counters plus queue depth"""
+        with self._lock:
+            return dict(self._stats, queued=len(self._queue))
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """Process-wide scheduler so every Chain in this process shares one view of the Groq limits"""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RateLimitScheduler()
+        return _default_scheduler
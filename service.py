@@ -0,0 +1,410 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from fetcher import is_valid_url
+from scheduler import PRIORITY_NAMES
+from tracing import tracer
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3")
+
+
+class JobQueue:
+    def __init__(self, path=DEFAULT_QUEUE_PATH, key_ttl_seconds=24 * 3600, job_timeout=600, max_attempts=3):
+        """SQLite-backed job queue shared by the HTTP handlers and the workers
+
+        A running job whose worker has not sent a heartbeat for job_timeout seconds (the
+        worker died) is queued again, up to max_attempts times. Idempotency keys are
+        honoured for key_ttl_seconds.
+        Interactive jobs are claimed before batch jobs (params["priority"]).
+        """
+        self.path = path
+        self.key_ttl_seconds = key_ttl_seconds
+        self.job_timeout = job_timeout
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                idempotency_key TEXT UNIQUE,
+                url TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "heartbeat_at" not in columns:
+            # Queues created before heartbeats
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _job(row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, url: str, params: Optional[Dict[str, Any]] = None,
+               key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """Queue a job; returns (job, created). A live job with the same key is returned as is"""
+        now = time.time()
+        with self._lock:
+            if key:
+                row = self._conn.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (key,)).fetchone()
+                if row is not None:
+                    if row["status"] != "error" and now - row["created_at"] < self.key_ttl_seconds:
+                        return self._job(row), False
+                    # Failed or expired: release the key so it can name a fresh job
+                    self._conn.execute("UPDATE jobs SET idempotency_key = NULL WHERE id = ?", (row["id"],))
+
+            job_id = uuid.uuid4().hex
+            self._conn.execute(
+                "INSERT INTO jobs (id, idempotency_key, url, params, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, key, url, json.dumps(params or {}), "queued", now)
+            )
+            self._conn.commit()
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row), True
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job (interactive first) as running and return it (None if the queue is empty)"""
+        now = time.time()
+        with self._lock:
+            stale = now - self.job_timeout
+            self._conn.execute(
+                "UPDATE jobs SET status = 'error', error = 'Worker died too many times', finished_at = ? "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= ?",
+                (now, stale, self.max_attempts)
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ?",
+                (stale,)
+            )
+            row = self._conn.execute(
+                """
+                UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, attempts = attempts + 1
+                WHERE id = (
+                    SELECT id FROM jobs WHERE status = 'queued'
+                    ORDER BY json_extract(params, '$.priority') = 'batch', created_at LIMIT 1
+                )
+                RETURNING *
+                """,
+                (now, now)
+            ).fetchone()
+            self._conn.commit()
+        return self._job(row)
+
+    def heartbeat(self, job_id: str, attempt: int) -> bool:
+        """Renew the lease on a claimed job so it isn't taken for a dead worker's job and run twice
+
+        ``attempt`` is the job's attempts count when it was claimed; False means the lease
+        was lost to another worker.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running' AND attempts = ?",
+                (time.time(), job_id, attempt)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def finish(self, job_id: str, attempt: int, record: Dict[str, Any]) -> bool:
+        """Store a pipeline result record; its status decides between done and error
+
+        Only the worker still holding the lease from claim (``attempt`` is the job's attempts
+        count then) may finish the job; returns False and stores nothing otherwise.
+        """
+        status = "done" if record.get("status") == "ok" else "error"
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND status = 'running' AND attempts = ?",
+                (status, json.dumps(record, ensure_ascii=False), record.get("error"), time.time(), job_id, attempt)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job, without its result"""
+    return {
+        "id": job["id"],
+        "url": job["url"],
+        "status": job["status"],
+        "error": job["error"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result_url": f"/jobs/{job['id']}/result"
+    }
+
+
+class GenerationService:
+    def __init__(self, runner, queue, workers=4, poll_interval=0.5, heartbeat_interval=None):
+        """Pool of workers draining the job queue through a BatchRunner on a background event loop
+
+        Workers renew the lease on their job every heartbeat_interval seconds (default a
+        quarter of the queue's job_timeout) for as long as they are processing it.
+        """
+        self.runner = runner
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval or queue.job_timeout / 4
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        """Start the worker pool in a daemon thread"""
+        self._thread = threading.Thread(target=asyncio.run, args=(self._main(),), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        self.notify()
+
+    def notify(self):
+        """Wake idle workers after a submit instead of waiting for the next poll"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _main(self):
+        self._wakeup = asyncio.Event()
+        await self.runner.start()
+        self._loop = asyncio.get_running_loop()
+        await asyncio.gather(*[self._worker() for _ in range(self.workers)])
+
+    async def _worker(self):
+        while not self._stopping:
+            job = await asyncio.to_thread(self.queue.claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            heartbeat = asyncio.create_task(self._heartbeat(job["id"], job["attempts"]))
+            try:
+                priority = PRIORITY_NAMES[job["params"].get("priority", "interactive")]
+                record = await self.runner.process_url(job["url"], job["params"].get("full_package"), priority)
+                record["trace"] = [span.to_dict() for span in tracer.trace(record["trace_id"])]
+            except Exception as e:
+                logging.error(f"Job {job['id']} failed: {e}")
+                record = {"url": job["url"], "status": "error", "error": f"{type(e).__name__}: {e}"}
+            finally:
+                heartbeat.cancel()
+            if not await asyncio.to_thread(self.queue.finish, job["id"], job["attempts"], record):
+                logging.warning(f"Job {job['id']} was reclaimed by another worker, dropping this result")
+                continue
+            logging.info(f"Job {job['id']} {record['status']} {job['url']}")
+
+    async def _heartbeat(self, job_id: str, attempt: int):
+        """Renew the job's lease until cancelled"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                if not await asyncio.to_thread(self.queue.heartbeat, job_id, attempt):
+                    logging.warning(f"Lost the lease on job {job_id}")
+                    return
+            except Exception as e:
+                logging.error(f"Heartbeat for job {job_id} failed: {e}")
+
+
+def make_handler(service: GenerationService):
+    """HTTP handler class bound to a service"""
+
+    class ServiceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                self._send_json(404, {"error": "Not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": "Body must be JSON"})
+                return
+
+            url = body.get("url")
+            if not url or not is_valid_url(url):
+                self._send_json(400, {"error": "A valid 'url' is required"})
+                return
+
+            priority = body.get("priority", "interactive")
+            if priority not in PRIORITY_NAMES:
+                self._send_json(400, {"error": f"'priority' must be one of {sorted(PRIORITY_NAMES)}"})
+                return
+
+            key = self.headers.get("Idempotency-Key") or body.get("idempotency_key")
+            params = {"full_package": bool(body.get("full_package", False)), "priority": priority}
+            job, created = service.queue.submit(url, params, key)
+            if created:
+                service.notify()
+            self._send_json(202 if created else 200, job_status(job))
+
+        def do_GET(self):
+            parts = [part for part in self.path.split("?")[0].split("/") if part]
+            if parts == ["healthz"]:
+                health = {"status": "ok", "jobs": service.queue.stats()}
+                embedding_cache = getattr(service.runner.portfolio, "embedding_cache", None)
+                if embedding_cache is not None:
+                    health["embeddings"] = embedding_cache.stats()
+                self._send_json(200, health)
+                return
+            if parts == ["metrics"]:
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if len(parts) not in (2, 3) or parts[0] != "jobs" or (len(parts) == 3 and parts[2] != "result"):
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            job = service.queue.get(parts[1])
+            if job is None:
+                self._send_json(404, {"error": "Unknown job"})
+            elif len(parts) == 2:
+                self._send_json(200, job_status(job))
+            elif job["status"] in ("done", "error"):
+                # Jobs given up on without a pipeline run (e.g. their worker kept dying) have no result record
+                self._send_json(200, job["result"] if job["result"] is not None else job_status(job))
+            else:
+                self._send_json(202, job_status(job))
+
+        def log_message(self, format, *args):
+            logging.debug(f"{self.address_string()} {format % args}")
+
+    return ServiceHandler
+
+
+class GenerationClient:
+    def __init__(self, base_url, timeout=10):
+        """Small client for the generation service's submit/status/result endpoints"""
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def submit(self, url: str, full_package: bool = False, key: Optional[str] = None,
+               priority: str = "interactive") -> Dict[str, Any]:
+        """Queue a job; ``priority`` is 'interactive' (served first) or 'batch'"""
+        headers = {"Idempotency-Key": key} if key else {}
+        response = self.session.post(f"{self.base_url}/jobs",
+                                     json={"url": url, "full_package": full_package, "priority": priority},
+                                     headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        response = self.session.get(f"{self.base_url}/jobs/{job_id}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job's result record, or None while it is still queued or running"""
+        response = self.session.get(f"{self.base_url}/jobs/{job_id}/result", timeout=self.timeout)
+        response.raise_for_status()
+        return None if response.status_code == 202 else response.json()
+
+    def wait(self, job_id: str, timeout=300, poll_interval=1.0, on_status=None) -> Dict[str, Any]:
+        """Poll until the job finishes; on_status(status_dict) is called after every poll"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status = self.status(job_id)
+            if on_status:
+                on_status(status)
+            if status["status"] in ("done", "error"):
+                return self.result(job_id)
+            time.sleep(poll_interval)
+        raise TimeoutError(f"Job {job_id} did not finish within {timeout}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP service that generates cold emails from a job queue")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4, help="Jobs processed concurrently")
+    parser.add_argument("--fetch-concurrency", type=int, default=16, help="Max concurrent page fetches")
+    parser.add_argument("--n-results", type=int, default=3, help="Portfolio projects per email")
+    parser.add_argument("--queue-path", default=DEFAULT_QUEUE_PATH, help="SQLite file backing the job queue")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", stream=sys.stderr)
+
+    # Imported here so the client above can be used without loading the pipeline
+    from batch import BatchRunner
+    from chains import Chain
+    from portfolio import Portfolio
+
+    runner = BatchRunner(Chain(), Portfolio(), fetch_concurrency=args.fetch_concurrency,
+                         llm_concurrency=args.workers, n_results=args.n_results)
+    service = GenerationService(runner, JobQueue(args.queue_path), workers=args.workers)
+    service.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    logging.info(f"Generation service listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
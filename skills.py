@@ -0,0 +1,229 @@
+import re
+import string
+from collections import Counter
+from typing import List
+
+# Canonical skill -> surface forms that should be reported as that skill
+SKILL_ALIASES = {
+    'python': ('python', 'python3'),
+    'javascript': ('javascript', 'js', 'ecmascript'),
+    'typescript': ('typescript',),
+    'java': ('java',),
+    'golang': ('golang',),
+    'c++': ('c++', 'cpp'),
+    'c#': ('c#', 'csharp'),
+    '.net': ('.net', 'dotnet'),
+    'php': ('php',),
+    'ruby': ('ruby', 'ruby on rails', 'rails'),
+    'rust': ('rust',),
+    'scala': ('scala',),
+    'react': ('react', 'reactjs', 'react.js'),
+    'angular': ('angular', 'angularjs'),
+    'vue': ('vue', 'vuejs', 'vue.js'),
+    'nodejs': ('nodejs', 'node.js', 'node js'),
+    'django': ('django',),
+    'flask': ('flask',),
+    'fastapi': ('fastapi',),
+    'spring': ('spring', 'spring boot'),
+    'graphql': ('graphql',),
+    'sql': ('sql',),
+    'postgresql': ('postgresql', 'postgres'),
+    'mysql': ('mysql',),
+    'mongodb': ('mongodb', 'mongo'),
+    'redis': ('redis',),
+    'elasticsearch': ('elasticsearch', 'elastic search'),
+    'kafka': ('kafka',),
+    'spark': ('spark', 'pyspark', 'apache spark'),
+    'airflow': ('airflow',),
+    'snowflake': ('snowflake',),
+    'aws': ('aws', 'amazon web services'),
+    'azure': ('azure',),
+    'gcp': ('gcp', 'google cloud'),
+    'docker': ('docker',),
+    'kubernetes': ('kubernetes', 'k8s'),
+    'terraform': ('terraform',),
+    'jenkins': ('jenkins',),
+    'linux': ('linux',),
+    'git': ('git',),
+    'ci/cd': ('ci/cd', 'cicd', 'continuous integration'),
+    'devops': ('devops',),
+    'microservices': ('microservices', 'microservice'),
+    'api': ('api', 'apis', 'rest api', 'restful'),
+    'html': ('html', 'html5'),
+    'css': ('css', 'css3'),
+    'frontend': ('frontend', 'front-end', 'front end'),
+    'backend': ('backend', 'back-end', 'back end'),
+    'fullstack': ('fullstack', 'full-stack', 'full stack'),
+    'machine learning': ('machine learning', 'ml'),
+    'data science': ('data science',),
+    'nlp': ('nlp', 'natural language processing'),
+    'llm': ('llm', 'llms', 'large language models'),
+    'tensorflow': ('tensorflow',),
+    'pytorch': ('pytorch',),
+    'pandas': ('pandas',),
+    'numpy': ('numpy',),
+    'database': ('database', 'databases'),
+    'cloud': ('cloud',),
+    'agile': ('agile',),
+    'scrum': ('scrum',),
+    'testing': ('testing',),
+    'automation': ('automation',),
+    'analytics': ('analytics',),
+    'visualization': ('visualization', 'visualisation'),
+}
+
+# Broad terms rank below specific technologies when they occur equally often
+SKILL_WEIGHTS = {
+    'api': 0.5, 'database': 0.5, 'cloud': 0.5, 'agile': 0.5, 'scrum': 0.5, 'testing': 0.5,
+    'automation': 0.5, 'analytics': 0.5, 'visualization': 0.5,
+}
+
+SKILL_VOCABULARY = frozenset(SKILL_ALIASES)
+
+MAX_SKILLS = 20
+MAX_KEYWORDS = 15
+
+# Common English words that are never useful as keywords
+STOPWORDS = frozenset({
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'her', 'was', 'one', 'our',
+    'had', 'what', 'were', 'they', 'have', 'this', 'from', 'that', 'will', 'with', 'been', 'said',
+    'each', 'which', 'their', 'time', 'about', 'would', 'there', 'could', 'other', 'after',
+    'first', 'well', 'water', 'than', 'many', 'them', 'these', 'come', 'made', 'then', 'more',
+    'very', 'when', 'much', 'before', 'here', 'through', 'just', 'good', 'should', 'because',
+    'those', 'people', 'most', 'some', 'new', 'write', 'like', 'where', 'right', 'see', 'him',
+    'two', 'how', 'its', 'who', 'oil', 'sit', 'now', 'find', 'long', 'down', 'day', 'did', 'get',
+    'has', 'may', 'his', 'old', 'take', 'cat', 'again', 'give', 'came', 'show', 'every', 'me',
+    'under', 'name', 'form', 'sentence', 'great', 'think', 'say', 'help', 'low', 'line', 'differ',
+    'turn', 'cause', 'mean', 'move', 'boy', 'too', 'same', 'tell', 'does', 'set', 'three', 'want',
+    'air', 'also', 'play', 'small', 'end', 'put', 'home', 'read', 'hand', 'port', 'large', 'spell',
+    'add', 'even', 'land', 'must', 'big', 'high', 'such', 'follow', 'act', 'why', 'ask', 'men',
+    'change', 'went', 'light', 'kind', 'off', 'need', 'house', 'picture', 'try', 'animal', 'point',
+    'mother', 'world', 'near', 'build', 'self', 'earth', 'father', 'head', 'stand', 'own', 'page',
+    'country', 'found', 'answer', 'school', 'grow', 'study', 'still', 'learn', 'plant', 'cover',
+    'food', 'sun', 'four', 'between', 'state', 'keep', 'eye', 'never', 'last', 'let', 'thought',
+    'city', 'tree', 'cross', 'farm', 'hard', 'start', 'might', 'story', 'saw', 'far', 'sea',
+    'draw', 'left', 'late', 'run', 'don', 'while', 'press', 'close', 'night', 'real', 'life',
+    'few', 'north', 'open', 'seem', 'together', 'next', 'white', 'children', 'begin', 'got',
+    'walk', 'example', 'ease', 'paper', 'group', 'always', 'music', 'both', 'mark', 'often',
+    'letter', 'until', 'mile', 'river', 'car', 'feet', 'care', 'second', 'book', 'carry', 'took',
+    'science', 'eat', 'room', 'friend', 'began', 'idea', 'fish', 'mountain', 'stop', 'once',
+    'base', 'hear', 'horse', 'cut', 'sure', 'watch', 'color', 'face', 'wood', 'main', 'enough',
+    'plain', 'girl', 'usual', 'young', 'ready', 'above', 'ever', 'red', 'list', 'though', 'feel',
+    'talk', 'bird', 'soon', 'body', 'dog', 'family', 'direct', 'leave', 'song', 'measure', 'door',
+    'product', 'black', 'short', 'numeral', 'class', 'wind', 'question', 'happen', 'complete',
+    'ship', 'area', 'half', 'rock', 'order', 'fire', 'south', 'problem', 'piece', 'told', 'knew',
+    'pass', 'since', 'top', 'whole', 'king', 'space', 'heard', 'best', 'hour', 'better', 'during',
+    'hundred', 'five', 'remember', 'step', 'early', 'hold', 'west', 'ground', 'interest', 'reach',
+    'fast', 'verb', 'sing', 'listen', 'six', 'table', 'travel', 'less', 'morning', 'ten', 'simple',
+    'several', 'vowel', 'toward', 'war', 'lay', 'against', 'pattern', 'slow', 'center', 'love',
+    'person', 'money', 'serve', 'appear', 'road', 'map', 'rain', 'rule', 'govern', 'pull', 'cold',
+    'notice', 'voice', 'unit', 'power', 'town', 'fine', 'certain', 'fly', 'fall', 'lead', 'cry',
+    'dark', 'machine', 'note', 'wait', 'plan', 'figure', 'star', 'box', 'noun', 'field', 'rest',
+    'correct', 'able', 'pound', 'done', 'beauty', 'drive', 'stood', 'contain', 'front', 'teach',
+    'week', 'final', 'gave', 'green', 'oh', 'quick', 'develop', 'ocean', 'warm', 'free', 'minute',
+    'strong', 'special', 'mind', 'behind', 'clear', 'tail', 'produce', 'fact', 'street', 'inch',
+    'multiply', 'nothing', 'course', 'stay', 'wheel', 'full', 'force', 'blue', 'object', 'decide',
+    'surface', 'deep', 'moon', 'island', 'foot', 'system', 'busy', 'test', 'record', 'boat',
+    'common', 'gold', 'possible', 'plane', 'stead', 'dry', 'wonder', 'laugh', 'thousands', 'ago',
+    'ran', 'check', 'game', 'shape', 'equate', 'hot', 'miss', 'brought', 'heat', 'snow', 'tire',
+    'bring', 'yes', 'distant', 'fill', 'east', 'paint', 'language', 'among', 'grand', 'ball',
+    'yet', 'wave', 'drop', 'heart', 'present', 'heavy', 'dance', 'engine', 'position', 'arm',
+    'wide', 'sail', 'material', 'size', 'vary', 'settle', 'speak', 'weight', 'general', 'ice',
+    'matter', 'circle', 'pair', 'include', 'divide', 'syllable', 'felt', 'perhaps', 'pick',
+    'sudden', 'count', 'square', 'reason', 'length', 'represent', 'art', 'subject', 'region',
+    'energy', 'hunt', 'probable', 'bed', 'brother', 'egg', 'ride', 'cell', 'believe', 'fraction',
+    'forest', 'race', 'window', 'store', 'summer', 'train', 'sleep', 'prove', 'lone', 'leg',
+    'exercise', 'wall', 'catch', 'mount', 'wish', 'sky', 'board', 'joy', 'winter', 'sat',
+    'written', 'wild', 'instrument', 'kept', 'glass', 'grass', 'cow', 'job', 'edge', 'sign',
+    'visit', 'past', 'soft', 'fun', 'bright', 'gas', 'weather', 'month', 'million', 'bear',
+    'finish', 'happy', 'hope', 'flower', 'clothe', 'strange', 'gone', 'jump', 'baby', 'eight',
+    'village', 'meet', 'root', 'buy', 'raise', 'solve', 'metal', 'whether', 'push', 'seven',
+    'paragraph', 'third', 'shall', 'held', 'hair', 'describe', 'cook', 'floor', 'either', 'result',
+    'burn', 'hill', 'safe', 'century', 'consider', 'type', 'law', 'bit', 'coast', 'copy', 'phrase',
+    'silent', 'tall', 'sand', 'soil', 'roll', 'temperature', 'finger', 'industry', 'value',
+    'fight', 'lie', 'beat', 'excite', 'natural', 'view', 'sense', 'ear', 'else', 'quite', 'broke',
+    'case', 'middle', 'kill', 'son', 'lake', 'moment', 'scale', 'loud', 'spring', 'observe',
+    'child', 'straight', 'consonant', 'nation', 'dictionary', 'milk', 'speed', 'method', 'organ',
+    'pay', 'age', 'section', 'dress', 'cloud', 'surprise', 'quiet', 'stone', 'tiny', 'climb',
+    'bad', 'blood', 'touch', 'grew', 'cent', 'mix', 'team', 'wire', 'cost', 'lost', 'brown',
+    'wear', 'garden', 'equal', 'sent', 'choose', 'fell', 'fit', 'flow', 'fair', 'bank', 'collect',
+    'save', 'control', 'decimal', 'gentle', 'woman', 'captain', 'practice', 'separate',
+    'difficult', 'doctor', 'please', 'protect', 'noon', 'whose', 'locate', 'ring', 'character',
+    'insect', 'caught', 'period', 'indicate', 'radio', 'spoke', 'atom', 'human', 'history',
+    'effect', 'electric', 'expect', 'crop', 'modern', 'element', 'hit', 'student', 'corner',
+    'party', 'supply', 'bone', 'rail', 'imagine', 'provide', 'agree', 'thus', 'capital', 'won',
+    'chair', 'danger', 'fruit', 'rich', 'thick', 'soldier', 'process', 'operate', 'guess',
+    'necessary', 'sharp', 'wing', 'create', 'neighbor', 'wash', 'bat', 'rather', 'crowd', 'corn',
+    'compare', 'poem', 'string', 'bell', 'depend', 'meat', 'rub', 'tube', 'famous', 'dollar',
+    'stream', 'fear', 'sight', 'thin', 'triangle', 'planet', 'hurry', 'chief', 'colony', 'clock',
+    'mine', 'tie', 'enter', 'major', 'fresh', 'search', 'send', 'yellow', 'gun', 'allow', 'print',
+    'dead', 'spot', 'desert', 'suit', 'current', 'lift', 'rose', 'continue', 'block', 'chart',
+    'hat', 'sell', 'success', 'company', 'subtract', 'event', 'particular', 'deal', 'swim', 'term',
+    'opposite', 'wife', 'shoe', 'shoulder', 'spread', 'arrange', 'camp', 'invent', 'cotton',
+    'born', 'determine', 'quart', 'nine', 'truck', 'noise', 'level', 'chance', 'gather', 'shop',
+    'stretch', 'throw', 'shine', 'property', 'column', 'molecule', 'select', 'wrong', 'gray',
+    'repeat', 'require', 'broad', 'prepare', 'salt', 'nose', 'plural', 'anger', 'claim',
+    'continent', 'oxygen', 'sugar', 'death', 'pretty', 'skill', 'women', 'season', 'solution',
+    'magnet', 'silver', 'thank', 'branch', 'match', 'suffix', 'especially', 'fig', 'afraid',
+    'huge', 'sister', 'steel', 'discuss', 'forward', 'similar', 'guide', 'experience', 'score',
+    'apple', 'bought', 'led', 'pitch', 'coat', 'mass', 'card', 'band', 'rope', 'slip', 'win',
+    'dream', 'evening', 'condition', 'feed', 'tool', 'total', 'basic', 'smell', 'valley', 'nor',
+    'double', 'seat', 'arrive', 'master', 'track', 'parent', 'shore', 'division', 'sheet',
+    'substance', 'favor', 'connect', 'post', 'spend', 'chord', 'fat', 'glad', 'original', 'share',
+    'station', 'dad', 'bread', 'charge', 'proper', 'bar', 'offer', 'segment', 'slave', 'duck',
+    'instant', 'market', 'degree', 'populate', 'chick', 'dear', 'enemy', 'reply', 'drink', 'occur',
+    'support', 'speech', 'nature', 'range', 'steam', 'motion', 'path', 'liquid', 'log', 'meant',
+    'quotient', 'teeth', 'shell', 'neck'})
+
+_ALIAS_TO_SKILL = {alias: skill for skill, aliases in SKILL_ALIASES.items() for alias in aliases}
+
+# Punctuation that separates tokens; ".#+/-" stay so "node.js", "c++", "c#" and "ci/cd" survive
+_SEPARATORS = str.maketrans({c: ' ' for c in string.punctuation if c not in '.#+/-'})
+_TOKEN_EDGES = '.-/'
+
+# Multi-word aliases are matched as phrases by one compiled alternation (longest first).
+# In the space-joined token stream every token starts after a space, so anchoring on " "
+# gives the left boundary for free and lets the regex engine use its fast literal search.
+_PHRASE_ALIASES = sorted((alias for alias in _ALIAS_TO_SKILL if ' ' in alias), key=len, reverse=True)
+_PHRASE_PATTERN = re.compile(" (" + "|".join(re.escape(alias) for alias in _PHRASE_ALIASES) + r")(?![\w#+]|\.\w)")
+_PHRASE_FIRST_WORDS = frozenset(alias.split()[0] for alias in _PHRASE_ALIASES)
+
+
+def extract_skills_from_text(text: str) -> List[str]:
+    """Extract relevant skills/keywords from job posting text
+
+    Known skills (with aliases folded to one name) come first, ranked by weighted count,
+    followed by the most frequent other keywords. Ties keep first-occurrence order, so
+    the result is the same on every run.
+    """
+    # Tokenising and counting happen in C; Python only looks at distinct tokens
+    tokens = text.lower().translate(_SEPARATORS).split()
+    token_counts = Counter(tokens)
+
+    skill_counts = Counter()
+    if not _PHRASE_FIRST_WORDS.isdisjoint(token_counts):
+        for alias, matches in Counter(_PHRASE_PATTERN.findall(" " + " ".join(tokens))).items():
+            skill_counts[_ALIAS_TO_SKILL[alias]] += matches
+            # The longest match wins: "node js" is not also "js", "google cloud" not also "cloud"
+            for word in alias.split():
+                token_counts[word] -= matches
+
+    keyword_counts = {}
+    for token, count in token_counts.items():
+        if count <= 0:
+            continue
+        if token not in _ALIAS_TO_SKILL:
+            token = token.rstrip(_TOKEN_EDGES)
+            if token not in _ALIAS_TO_SKILL:
+                token = token.lstrip(_TOKEN_EDGES)
+        skill = _ALIAS_TO_SKILL.get(token)
+        if skill is not None:
+            skill_counts[skill] += count
+        elif len(token) >= 3 and token.isascii() and token.isalpha() and token not in STOPWORDS:
+            keyword_counts[token] = keyword_counts.get(token, 0) + count
+
+    # Dicts preserve first-occurrence order and sorted() is stable, so ties stay in text order
+    skills = sorted(skill_counts, key=lambda s: -skill_counts[s] * SKILL_WEIGHTS.get(s, 1.0))
+    keywords = sorted(keyword_counts, key=lambda w: -keyword_counts[w])
+
+    return (skills + keywords[:MAX_KEYWORDS])[:MAX_SKILLS]
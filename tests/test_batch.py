@@ -0,0 +1,67 @@
+import asyncio
+import io
+import json
+
+from fake_llm import FakeChatModel
+
+from batch import BatchRunner
+from chains import Chain
+from checkpoint import BatchCheckpoint
+from llm_cache import LLMCache
+from scheduler import RateLimitScheduler
+
+POSTING = """Senior Python Engineer
+About the role
+We are looking for a senior engineer to build and run the data platform behind our analytics products.
+Requirements
+- 5+ years of experience building backend services in Python
+- Hands-on experience with AWS, Docker and Kubernetes in production
+- Strong knowledge of SQL, data modelling and streaming pipelines
+- Experience mentoring engineers and leading technical design reviews
+Responsibilities
+- Design, build and operate reliable APIs and batch jobs
+- Work with product and data science teams on new features
+"""
+
+
+class DictFetcher:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def load_text(self, url):
+        return self.pages[url]
+
+
+class StaticPortfolio:
+    version = "test"
+
+    def load_portfolio(self):
+        pass
+
+    def query_links(self, skills, n_results=3):
+        return [{"title": "Data platform", "link": "https://example.com/platform"}]
+
+
+def run_batch(tmp_path, pages, llm):
+    runner = BatchRunner(
+        Chain(cache=LLMCache(enabled=False), llm=llm, scheduler=RateLimitScheduler(10 ** 6, 10 ** 9)),
+        StaticPortfolio(), fetcher=DictFetcher(pages), analysis_cache=LLMCache(enabled=False), deduplicate=True,
+        checkpoint=BatchCheckpoint(str(tmp_path / "checkpoint.sqlite3"))
+    )
+    out = io.StringIO()
+    stats = asyncio.run(runner.run(list(pages), out))
+    return stats, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_postings_resumed_from_a_checkpoint_are_indexed_for_dedup(tmp_path):
+    original = "https://example.com/jobs/1"
+    duplicate = "https://example.com/jobs/2"
+    llm = FakeChatModel(latency=0, tokens_per_second=10 ** 6)
+    stats, _ = run_batch(tmp_path, {original: POSTING}, llm)
+    assert stats["ok"] == 1
+
+    stats, records = run_batch(tmp_path, {original: POSTING, duplicate: POSTING.replace("5+ years", "five years")},
+                               llm)
+    assert stats == {"total": 2, "ok": 2, "error": 0, "resumed": 1}
+    assert records[0]["url"] == duplicate
+    assert records[0]["duplicate_of"] == original
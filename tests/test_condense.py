@@ -0,0 +1,42 @@
+from condense import condense_job_text
+
+
+def condensed_lines(text, budget=1500):
+    return condense_job_text(text, budget)["text"].splitlines()
+
+
+def test_requirement_sentences_are_not_taken_for_boilerplate():
+    requirements = [
+        "5+ years of experience with API design in Python and Go.",
+        "Experience maintaining a large backlog in Jira and planning sprints.",
+        "Built a product catalog in PostgreSQL serving millions of subscribers.",
+    ]
+    text = "\n".join(["Backend Engineer", "Acme", "Requirements"] + requirements)
+    lines = condensed_lines(text)
+    for requirement in requirements:
+        assert requirement in lines
+
+
+def test_site_chrome_is_still_dropped():
+    text = "\n".join(["Backend Engineer", "Sign in", "We use cookies to improve your experience.",
+                      "© 2025 Acme", "Subscribe to our newsletter", "Requirements",
+                      "5+ years of experience with Python."])
+    assert condensed_lines(text) == ["Backend Engineer", "Requirements", "5+ years of experience with Python."]
+
+
+def test_short_requirement_bullets_are_kept_but_navigation_runs_are_dropped():
+    text = "\n".join(["Home", "Jobs", "Teams", "Blog", "Contact",
+                      "Backend Engineer", "Acme is hiring an engineer to build its logistics platform.",
+                      "Requirements", "Python", "Django", "PostgreSQL", "AWS", "Docker"])
+    lines = condensed_lines(text)
+    assert lines[-6:] == ["Requirements", "Python", "Django", "PostgreSQL", "AWS", "Docker"]
+    assert "Home" not in lines and "Contact" not in lines
+
+
+def test_requirements_outrank_benefits_under_a_tight_budget():
+    text = "\n".join(["Senior Python Engineer", "Acme is hiring a senior engineer for its platform team.",
+                      "Requirements", "5+ years of Python", "Docker and Kubernetes", "PostgreSQL at scale",
+                      "Benefits"] + [f"Benefit number {i} for you" for i in range(27)])
+    lines = condensed_lines(text, budget=60)
+    assert "PostgreSQL at scale" in lines
+    assert not any(line.startswith("Benefit number") for line in lines)
@@ -0,0 +1,21 @@
+import time
+
+from fetcher import PageCache
+
+
+def test_page_cache_keeps_the_most_recently_fetched_pages(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite3"), max_entries=2)
+    for i in range(3):
+        cache.put(f"https://example.com/{i}", f"<p>{i}</p>", None, None)
+        time.sleep(0.01)
+    assert cache.get("https://example.com/0") is None
+    assert cache.get("https://example.com/2")["body"] == "<p>2</p>"
+
+
+def test_page_cache_drops_expired_pages(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite3"), ttl_seconds=0.05)
+    cache.put("https://example.com/old", "<p>old</p>", None, None)
+    time.sleep(0.1)
+    cache.put("https://example.com/new", "<p>new</p>", None, None)
+    assert cache.get("https://example.com/old") is None
+    assert cache.get("https://example.com/new") is not None
@@ -0,0 +1,209 @@
+import asyncio
+
+import pytest
+from fake_llm import FakeChatModel
+
+from scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimitScheduler, TokenBucket
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def make_scheduler(**kwargs):
+    return RateLimitScheduler(requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9, base_delay=0.001,
+                              max_delay=0.01, **kwargs)
+
+
+def flaky(failures, error):
+    """Callable that raises ``error`` ``failures`` times, then returns "ok\""""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+
+    fn.calls = calls
+    return fn
+
+
+def test_call_retries_rate_limits_until_success():
+    scheduler = make_scheduler()
+    fn = flaky(2, StatusError(429))
+    assert scheduler.call(fn, tokens=10) == "ok"
+    assert len(fn.calls) == 3
+    stats = scheduler.stats()
+    assert stats["retries"] == 2
+    assert stats["throttled"] == 2
+    assert stats["failed"] == 0
+
+
+def test_call_gives_up_after_max_retries():
+    scheduler = make_scheduler(max_retries=2)
+    fn = flaky(10, StatusError(500))
+    with pytest.raises(StatusError):
+        scheduler.call(fn, tokens=10)
+    assert len(fn.calls) == 3
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_call_does_not_retry_client_errors():
+    scheduler = make_scheduler()
+    fn = flaky(1, StatusError(400))
+    with pytest.raises(StatusError):
+        scheduler.call(fn, tokens=10)
+    assert len(fn.calls) == 1
+
+
+def test_stop_on_raises_without_retrying():
+    scheduler = make_scheduler()
+    fn = flaky(1, StatusError(503))
+    with pytest.raises(StatusError):
+        scheduler.call(fn, tokens=10, stop_on=lambda e: e.status_code == 503)
+    assert len(fn.calls) == 1
+    assert scheduler.stats()["retries"] == 0
+
+
+def test_acall_retries_with_fresh_awaitable():
+    scheduler = make_scheduler()
+    fn = flaky(1, StatusError(429))
+
+    async def attempt():
+        return fn()
+
+    assert asyncio.run(scheduler.acall(attempt, tokens=10)) == "ok"
+    assert len(fn.calls) == 2
+
+
+def test_interactive_calls_are_admitted_before_earlier_batch_calls():
+    scheduler = make_scheduler()
+    # One request at a time, refilled every 50 ms
+    scheduler.requests = TokenBucket(1, 20)
+    order = []
+
+    async def waiter(name, priority):
+        await scheduler.aacquire(1, priority)
+        order.append(name)
+
+    async def main():
+        await scheduler.aacquire(1, PRIORITY_INTERACTIVE)  # empties the bucket
+        batch = [asyncio.create_task(waiter(f"batch{i}", PRIORITY_BATCH)) for i in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(waiter("interactive", PRIORITY_INTERACTIVE))
+        await asyncio.gather(*batch, interactive)
+
+    asyncio.run(main())
+    assert order == ["interactive", "batch0", "batch1"]
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = make_scheduler()
+    scheduler.requests = TokenBucket(1, 20)
+
+    async def main():
+        await scheduler.aacquire(1)
+        waiting = asyncio.create_task(scheduler.aacquire(1, PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0.01)
+        assert scheduler.stats()["queued"] == 1
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert scheduler.stats()["queued"] == 0
+        # A cancelled head of the queue must not block the callers behind it
+        await asyncio.wait_for(scheduler.aacquire(1, PRIORITY_BATCH), timeout=1)
+
+    asyncio.run(main())
+
+
+def test_chain_calls_use_the_priority_of_the_current_context():
+    from chains import Chain
+    from fake_llm import FakeChatModel
+    from llm_cache import LLMCache
+    from scheduler import call_priority
+
+    class RecordingScheduler(RateLimitScheduler):
+        def __init__(self):
+            super().__init__(requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9)
+            self.priorities = []
+
+        async def aacquire(self, tokens, priority=PRIORITY_INTERACTIVE):
+            self.priorities.append(priority)
+            return await super().aacquire(tokens, priority)
+
+    scheduler = RecordingScheduler()
+    chain = Chain(cache=LLMCache(enabled=False), llm=FakeChatModel(latency=0), scheduler=scheduler)
+
+    async def main():
+        await chain.awrite_mail("Python engineer", [])
+        token = call_priority.set(PRIORITY_BATCH)
+        try:
+            await chain.awrite_mail("Data engineer", [])
+        finally:
+            call_priority.reset(token)
+
+    asyncio.run(main())
+    assert scheduler.priorities == [PRIORITY_INTERACTIVE, PRIORITY_BATCH]
+
+
+
+class OverloadedPrimaryModel(FakeChatModel):
+    """Fake LLM whose "primary" model is overloaded and whose fallback is throttled ``failures_left`` times"""
+
+    calls: list = []
+    failures_left: int = 0
+
+    def _check(self, kwargs):
+        self.calls.append(kwargs.get("model"))
+        if kwargs.get("model") == "primary":
+            raise StatusError(503)
+        if self.failures_left:
+            self.failures_left -= 1
+            raise StatusError(429)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check(kwargs)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._check(kwargs)
+        yield from super()._stream(messages, stop, run_manager, **kwargs)
+
+
+def make_fallback_chain(tmp_path, llm, scheduler):
+    from chains import Chain
+    from llm_cache import LLMCache
+    from router import ModelRouter
+
+    return Chain(cache=LLMCache(str(tmp_path / "llm.sqlite3")), llm=llm, scheduler=scheduler,
+                 router=ModelRouter(primary_model="primary", fallback_model="fallback"))
+
+
+def test_fallback_completion_is_cached_under_the_primary_key(tmp_path):
+    llm = OverloadedPrimaryModel(latency=0, calls=[])
+    chain = make_fallback_chain(tmp_path, llm, make_scheduler())
+
+    first = chain.write_mail("Python engineer", [], raise_errors=True)
+    assert llm.calls == ["primary", "fallback"]
+    assert chain.write_mail("Python engineer", [], raise_errors=True) == first
+    assert llm.calls == ["primary", "fallback"]
+
+
+def test_stream_fallback_gets_its_own_retries_and_counts_failures(tmp_path):
+    llm = OverloadedPrimaryModel(latency=0, tokens_per_second=10 ** 6, calls=[], failures_left=1)
+    scheduler = make_scheduler(max_retries=1)
+    chain = make_fallback_chain(tmp_path, llm, scheduler)
+
+    # One throttled fallback call is retried even though the primary already used attempt 0
+    email = "".join(chain.stream_mail("Python engineer", []))
+    assert not email.startswith("Error generating email")
+    assert llm.calls == ["primary", "fallback", "fallback"]
+    assert scheduler.stats()["failed"] == 1
+
+    llm.failures_left = 2
+    email = "".join(chain.stream_mail("Data engineer", []))
+    assert email.startswith("Error generating email")
+    assert scheduler.stats()["failed"] == 3
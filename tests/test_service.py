@@ -0,0 +1,80 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import requests
+
+from service import GenerationService, JobQueue, make_handler
+
+
+def test_interactive_jobs_are_claimed_before_earlier_batch_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.submit("https://example.com/1", {"priority": "batch"})
+    queue.submit("https://example.com/2", {"priority": "batch"})
+    queue.submit("https://example.com/3", {"priority": "interactive"})
+    claimed = [queue.claim()["url"] for _ in range(3)]
+    assert claimed == ["https://example.com/3", "https://example.com/1", "https://example.com/2"]
+    assert queue.claim() is None
+
+
+def test_heartbeat_keeps_a_live_job_from_being_requeued(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), job_timeout=0.2)
+    queue.submit("https://example.com/live")
+    job = queue.claim()
+    for _ in range(3):
+        time.sleep(0.1)
+        assert queue.heartbeat(job["id"], job["attempts"])
+        assert queue.claim() is None
+    assert queue.get(job["id"])["status"] == "running"
+    assert queue.get(job["id"])["attempts"] == 1
+
+
+def test_job_without_heartbeat_is_requeued_then_failed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), job_timeout=0.05, max_attempts=2)
+    job, _ = queue.submit("https://example.com/dead")
+    assert queue.claim()["id"] == job["id"]
+    time.sleep(0.1)
+    assert queue.claim()["attempts"] == 2
+    time.sleep(0.1)
+    assert queue.claim() is None
+    failed = queue.get(job["id"])
+    assert failed["status"] == "error"
+    assert failed["error"] == "Worker died too many times"
+
+
+def test_worker_that_lost_its_lease_cannot_finish_the_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), job_timeout=0.05)
+    queue.submit("https://example.com/slow")
+    stale = queue.claim()
+    time.sleep(0.1)
+    current = queue.claim()
+    assert current["id"] == stale["id"]
+
+    assert not queue.heartbeat(stale["id"], stale["attempts"])
+    assert not queue.finish(stale["id"], stale["attempts"], {"status": "error", "error": "stale"})
+    assert queue.get(stale["id"])["status"] == "running"
+
+    assert queue.finish(current["id"], current["attempts"], {"status": "ok", "email": "Hi"})
+    assert queue.get(current["id"])["result"] == {"status": "ok", "email": "Hi"}
+    assert not queue.finish(current["id"], current["attempts"], {"status": "error", "error": "late"})
+
+
+def test_result_of_a_job_without_a_record_is_its_status(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), job_timeout=0.01, max_attempts=1)
+    job, _ = queue.submit("https://example.com/dead")
+    queue.claim()
+    time.sleep(0.05)
+    queue.claim()
+
+    service = GenerationService(runner=None, queue=queue)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        response = requests.get(f"http://127.0.0.1:{server.server_port}/jobs/{job['id']}/result", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert response.status_code == 200
+    record = response.json()
+    assert record["status"] == "error"
+    assert record["error"] == "Worker died too many times"
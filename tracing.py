@@ -0,0 +1,226 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# Histogram bucket upper bounds in seconds for the Prometheus export
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        """One timed unit of work; attributes hold tokens, cache hits and similar details"""
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, key, value):
+        """Attach an attribute, ignoring None so missing metadata doesn't clutter exports"""
+        if value is not None:
+            self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class Tracer:
+    def __init__(self, max_spans=10000, jsonl_path=None):
+        """Collects finished spans in memory and keeps per-span-name aggregates
+
+        If jsonl_path is set (or TRACE_JSONL in the environment), every finished span is
+        also appended to that file as one JSON line.
+        """
+        self.spans = deque(maxlen=max_spans)
+        self.jsonl_path = jsonl_path or os.getenv("TRACE_JSONL")
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._counters = {}
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a block; nested spans share the trace id of the enclosing span"""
+        parent = _current_span.get()
+        span = Span(
+            name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes
+        )
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # A generator span can be closed from a different context than it was opened in
+                _current_span.set(parent)
+            self._finish(span)
+
+    def count(self, name: str, value: int = 1, **labels):
+        """Increment a labelled counter, exported as coldemail_<name>_total"""
+        key = (name, tuple(sorted((label, str(label_value)) for label, label_value in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _finish(self, span: Span):
+        """Store a finished span and fold it into the aggregates"""
+        with self._lock:
+            self.spans.append(span)
+            metrics = self._metrics.setdefault(span.name, {
+                "count": 0,
+                "errors": 0,
+                "duration_sum": 0.0,
+                "buckets": [0] * len(DURATION_BUCKETS),
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cache_hits": 0
+            })
+            seconds = span.duration_ms / 1000
+            metrics["count"] += 1
+            metrics["duration_sum"] += seconds
+            bucket = bisect.bisect_left(DURATION_BUCKETS, seconds)
+            if bucket < len(DURATION_BUCKETS):
+                metrics["buckets"][bucket] += 1
+            if span.error:
+                metrics["errors"] += 1
+            metrics["prompt_tokens"] += span.attributes.get("prompt_tokens", 0)
+            metrics["completion_tokens"] += span.attributes.get("completion_tokens", 0)
+            if span.attributes.get("cache_hit"):
+                metrics["cache_hits"] += 1
+
+        if self.jsonl_path:
+            try:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(span.to_dict()) + "\n")
+            except Exception as e:
+                logging.error(f"Failed to write span to {self.jsonl_path}: {e}")
+
+    def trace(self, trace_id: str) -> List[Span]:
+        """Finished spans belonging to one trace, in start order"""
+        with self._lock:
+            spans = [s for s in self.spans if s.trace_id == trace_id]
+        return sorted(spans, key=lambda s: s.start_time)
+
+    def export_jsonl(self, path: str):
+        """Write all retained spans to a JSONL file"""
+        with self._lock:
+            spans = list(self.spans)
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict()) + "\n")
+
+    def prometheus_text(self) -> str:
+        """Aggregates in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = {name: dict(values, buckets=list(values["buckets"])) for name, values in self._metrics.items()}
+            counters = dict(self._counters)
+
+        lines = [
+            "# HELP coldemail_span_duration_seconds Duration of pipeline steps and LLM calls",
+            "# TYPE coldemail_span_duration_seconds histogram"
+        ]
+        for name, values in sorted(metrics.items()):
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, values["buckets"]):
+                cumulative += count
+                lines.append(f'coldemail_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'coldemail_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {values["count"]}')
+            lines.append(f'coldemail_span_duration_seconds_sum{{span="{name}"}} {values["duration_sum"]:.6f}')
+            lines.append(f'coldemail_span_duration_seconds_count{{span="{name}"}} {values["count"]}')
+
+        lines += ["# HELP coldemail_span_errors_total Spans that ended with an exception",
+                  "# TYPE coldemail_span_errors_total counter"]
+        lines += [f'coldemail_span_errors_total{{span="{name}"}} {v["errors"]}' for name, v in sorted(metrics.items())]
+
+        lines += ["# HELP coldemail_llm_tokens_total Tokens reported by the LLM",
+                  "# TYPE coldemail_llm_tokens_total counter"]
+        for name, values in sorted(metrics.items()):
+            if values["prompt_tokens"] or values["completion_tokens"]:
+                lines.append(f'coldemail_llm_tokens_total{{span="{name}",kind="prompt"}} {values["prompt_tokens"]}')
+                lines.append(f'coldemail_llm_tokens_total{{span="{name}",kind="completion"}} {values["completion_tokens"]}')
+
+        lines += ["# HELP coldemail_llm_cache_hits_total LLM calls answered from the response cache",
+                  "# TYPE coldemail_llm_cache_hits_total counter"]
+        lines += [f'coldemail_llm_cache_hits_total{{span="{name}"}} {v["cache_hits"]}'
+                  for name, v in sorted(metrics.items()) if v["cache_hits"]]
+
+        for counter in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE coldemail_{counter}_total counter")
+            for (name, labels), value in sorted(counters.items()):
+                if name == counter:
+                    label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+                    lines.append(f"coldemail_{counter}_total{{{label_text}}} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int = 9464, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Serve prometheus_text() on http://host:port/metrics from a background thread"""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Serving metrics on http://{host}:{server.server_port}/metrics")
+        return server
+
+
+def record_llm_usage(span: Span, message: Optional[Any]):
+    """Copy prompt/completion token counts from a LangChain AI message onto a span"""
+    if message is None:
+        return
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage:
+        span.set("prompt_tokens", usage.get("input_tokens"))
+        span.set("completion_tokens", usage.get("output_tokens"))
+        return
+    token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+    span.set("prompt_tokens", token_usage.get("prompt_tokens"))
+    span.set("completion_tokens", token_usage.get("completion_tokens"))
+
+
+# Process-wide tracer used by Chain, the app and the batch runner
+tracer = Tracer()